@@ -0,0 +1,146 @@
+## Vectorized SDI calculation for many locations at once (requires NumPy).
+## Bird counts of all locations are stored back to back in one flat array; each location's
+## counts are the slice between its start and end offsets (ragged layout, as in RecordsIndex).
+## Sums of n(n-1) and n for every location are found in a single NumPy pass, so the cost per
+## location is a few array operations instead of a Python loop and function call.
+## Locations with fewer than two birds in total get NaN instead of raising ZeroDivisionError.
+## batch_diversity is the batched form of SDI_diversity.py: every diversity metric of every location
+## from the same cumulative sums.
+
+
+## LOADING THE LIBRARIES
+import numpy as np
+
+from SDI_calculator import MULTIPLICATION_FACTOR
+from SDI_diversity import check_metrics
+from SDI_profiling import instrumented
+
+
+## DEFINING FUNCTIONS
+# Calculates total birds (N) and sum of n(n-1) for every location in one pass.
+# Parameters: flat sequence of int (bird counts of all locations), sequence of int (start offsets),
+# sequence of int (end offsets). Location i's counts are counts[starts[i]:ends[i]].
+# Returns a tuple of two int64 arrays: N and sum of n(n-1), one value per location.
+def batch_totals(counts, starts, ends):
+    count_array = np.asarray(counts, dtype=np.int64)
+    start_array = np.asarray(starts, dtype=np.intp)
+    end_array = np.asarray(ends, dtype=np.intp)
+    # Cumulative sums with a leading 0: sum of a slice is the difference of two cumulative sums.
+    # Unlike np.add.reduceat, this gives 0 for locations without records.
+    total_cumsum = np.concatenate(([0], np.cumsum(count_array)))
+    pairs_cumsum = np.concatenate(([0], np.cumsum(count_array * (count_array - 1))))
+    total_array = total_cumsum[end_array] - total_cumsum[start_array]
+    pairs_array = pairs_cumsum[end_array] - pairs_cumsum[start_array]
+    return total_array, pairs_array
+
+
+# Calculates SDI from arrays of total birds (N) and sum of n(n-1), one value per location.
+# Same result and MULTIPLICATION_FACTOR scaling as calculate_index; NaN where N <= 1.
+# Returns an array of float.
+def index_from_totals(total_array, pairs_array):
+    total_array = np.asarray(total_array, dtype=np.int64)
+    pairs_array = np.asarray(pairs_array, dtype=np.int64)
+    index_array = np.full(total_array.shape, np.nan)
+    valid = total_array > 1
+    denominator = total_array[valid] * (total_array[valid] - 1)
+    index_array[valid] = (1 - pairs_array[valid] / denominator) * MULTIPLICATION_FACTOR
+    return index_array
+
+
+# Calculates SDI for many locations in one pass.
+# Parameters: flat sequence of int (bird counts), sequence of int (start offsets), sequence of int
+# (end offsets), list of str (location names, same order as offsets).
+# Returns dict {location name : SDI}, with NaN for locations with fewer than two birds.
+def batch_index(counts, starts, ends, locations):
+    index_array = index_from_totals(*batch_totals(counts, starts, ends))
+    return dict(zip(locations, index_array.tolist()))
+
+
+# Finds the offsets of locations of a RecordsIndex in its flat count list.
+# Parameters: RecordsIndex, list of str (location names, None for all locations in file order).
+# Returns a tuple: list of str (location names), list of int (start offsets), list of int (end offsets).
+# Raises ValueError if a location is not in the records.
+def records_offsets(records, locations=None):
+    if locations is None:
+        locations = records.locations()
+    try:
+        offsets = [records.location_index[location] for location in locations]
+    except KeyError as error:
+        raise ValueError(f"{error.args[0]} is not in the observation records.") from None
+    starts = [start_int for start_int, end_int in offsets]
+    ends = [end_int for start_int, end_int in offsets]
+    return locations, starts, ends
+
+
+# Calculates SDI for locations of a RecordsIndex in one pass.
+# Parameters: RecordsIndex, list of str (location names, None for all locations in file order).
+# Returns dict {location name : SDI}, with NaN for locations with fewer than two birds.
+# Raises ValueError if a location is not in the records.
+@instrumented("batch_index", lambda args, kwargs, result: (0, len(result)))
+def records_batch_index(records, locations=None):
+    locations, starts, ends = records_offsets(records, locations)
+    return batch_index(records.count_list, starts, ends, locations)
+
+
+# Calculates diversity metrics (see SDI_diversity.py) for many locations in one pass.
+# Parameters: flat sequence of int (bird counts), sequence of int (start offsets), sequence of int
+# (end offsets), list of str (metric names, None for all).
+# Returns dict {metric name : array}, one value per location, NaN where a metric is undefined.
+# Integer metrics and simpson are the same as in SDI_diversity.py; shannon and evenness are sums of floats,
+# so they can differ from the scalar form in the last digits.
+# Raises ValueError for an unknown metric.
+def batch_diversity(counts, starts, ends, metrics=None):
+    metrics = check_metrics(metrics)
+    count_array = np.asarray(counts, dtype=np.int64)
+    start_array = np.asarray(starts, dtype=np.intp)
+    end_array = np.asarray(ends, dtype=np.intp)
+    count_array = np.where(count_array > 0, count_array, 0)  # Counts of 0 add nothing, as in diversity_totals.
+    count_float = count_array.astype(np.float64)
+    log_array = np.zeros(count_float.shape)
+    np.log(count_float, out=log_array, where=count_array > 0)
+
+    # Same cumulative sum differences as batch_totals, for each total.
+    def segment_sums(values):
+        cumsum = np.concatenate(([0], np.cumsum(values)))
+        return cumsum[end_array] - cumsum[start_array]
+
+    total_array = segment_sums(count_array)
+    pairs_array = segment_sums(count_array * (count_array - 1))
+    squares_array = segment_sums(count_array * count_array)
+    log_sum_array = segment_sums(count_float * log_array)
+    species_array = segment_sums((count_array > 0).astype(np.int64))
+    total_float = total_array.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # H' = ln(N) - sum of n*ln(n) / N
+        shannon_array = np.where(total_array > 0, np.log(total_float) - log_sum_array / total_float, np.nan)
+        result_dict = {}
+        for metric in metrics:
+            if metric == "total":
+                result_dict[metric] = total_array
+            elif metric == "richness":
+                result_dict[metric] = species_array
+            elif metric == "simpson":
+                result_dict[metric] = index_from_totals(total_array, pairs_array)
+            elif metric == "inverse_simpson":
+                result_dict[metric] = np.where(pairs_array > 0, total_float * (total_float - 1) / pairs_array, np.nan)
+            elif metric == "gini_simpson":
+                result_dict[metric] = np.where(total_array > 0, 1 - squares_array / (total_float * total_float), np.nan)
+            elif metric == "shannon":
+                result_dict[metric] = shannon_array
+            else:  # Evenness.
+                result_dict[metric] = np.where(species_array > 1, shannon_array / np.log(species_array), np.nan)
+    return result_dict
+
+
+# Calculates diversity metrics for locations of a RecordsIndex in one pass.
+# Parameters: RecordsIndex, list of str (location names, None for all locations in file order),
+# list of str (metric names, None for all).
+# Returns dict {location name : {metric name : value}}, NaN where a metric is undefined.
+# Raises ValueError if a location is not in the records, or for an unknown metric.
+@instrumented("batch_diversity", lambda args, kwargs, result: (0, len(result)))
+def records_batch_diversity(records, locations=None, metrics=None):
+    locations, starts, ends = records_offsets(records, locations)
+    array_dict = batch_diversity(records.count_list, starts, ends, metrics)
+    value_lists = {metric: array.tolist() for metric, array in array_dict.items()}
+    return {location: {metric: value_list[i] for metric, value_list in value_lists.items()}
+            for i, location in enumerate(locations)}
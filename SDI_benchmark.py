@@ -0,0 +1,213 @@
+## Benchmark of the SDI pipeline on synthetic observation files.
+## Generates seeded observation files in the observation_records.txt format (any number of locations,
+## configurable species richness and bird count distribution), then times each stage separately:
+## parse (read_records), split (split_records), compute (calculate_index), write (report of all
+## locations) and, if NumPy is installed, batch (vectorized SDI of all locations).
+## Results are written as JSON and can be compared with a previous run to catch regressions: a stage
+## regresses if its median time is more than REGRESSION_THRESHOLD times the previous median and also
+## more than NOISE_FLOOR seconds slower, so that sub-millisecond stages don't fail on timer noise.
+## Usage: python SDI_benchmark.py [-n locations ...] [--richness min max] [--distribution name] [--seed seed]
+##                                [--repeat n] [--json results file] [--compare previous results file]
+##                                [--noise-floor seconds]
+##                                [--generate file]
+
+
+## LOADING THE LIBRARIES
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from SDI_calculator import END_MARKER, calculate_index, read_records, split_records
+from SDI_report import ReportWriter
+
+
+## DEFINING CONSTANTS
+LOCATION_COUNTS = [10, 1000, 100000]  # Default sizes, in locations.
+SPECIES_POOL = 2000  # Number of different species names in generated files.
+REGRESSION_THRESHOLD = 1.10  # A stage is a regression if it is more than 10% slower than in the previous run...
+NOISE_FLOOR = 0.005  # ... and more than 5 ms slower (smaller differences are timer noise).
+DISTRIBUTIONS = ["geometric", "uniform", "lognormal"]
+
+
+## GENERATING OBSERVATION FILES
+# Returns a bird count drawn from a distribution (always 1 or greater).
+# Parameters: random.Random, str (distribution name in DISTRIBUTIONS), float (mean bird count).
+def draw_count(rng, distribution, mean_float):
+    if distribution == "uniform":
+        return rng.randint(1, max(1, int(2 * mean_float - 1)))
+    if distribution == "lognormal":  # Few very abundant species, many rare ones.
+        return max(1, int(rng.lognormvariate(math.log(mean_float) - 0.5, 1.0)))
+    if mean_float <= 1:
+        return 1
+    # Geometric: number of trials until first success, with success probability 1 / mean.
+    return int(math.log(1 - rng.random()) / math.log(1 - 1 / mean_float)) + 1
+
+
+# Writes a seeded synthetic observation file.
+# Parameters: str (file name), int (number of locations), int and int (minimum and maximum number of species
+# per location), str (count distribution in DISTRIBUTIONS), float (mean bird count), int (random seed).
+# Returns the file's size in bytes.
+def generate_observations(file_name, location_count, min_richness=5, max_richness=40, distribution="geometric",
+                          mean_count=5.0, seed=0):
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution}.")
+    rng = random.Random(seed)
+    species_names = [f"Species {i:05d}" for i in range(SPECIES_POOL)]
+    with open(file_name, "w") as output_file:
+        for i in range(location_count):
+            lines = [f"Location {i:07d}"]
+            for species in rng.sample(species_names, rng.randint(min_richness, min(max_richness, SPECIES_POOL))):
+                lines.append(species)
+                lines.append(str(draw_count(rng, distribution, mean_count)))
+            output_file.write("\n".join(lines) + "\n\n")
+        output_file.write(END_MARKER)
+    return os.path.getsize(file_name)
+
+
+## TIMING STAGES
+# Runs a function several times and returns its timings.
+# Parameters: function without parameters, int (number of runs).
+# Returns a tuple: dict {"runs", "min", "median"} in seconds, result of the last run.
+def time_stage(function, repeat_int):
+    runs = []
+    result = None
+    for i in range(repeat_int):
+        start_float = time.perf_counter()
+        result = function()
+        runs.append(time.perf_counter() - start_float)
+    return {"runs": runs, "min": min(runs), "median": statistics.median(runs)}, result
+
+
+# Times each stage of the pipeline on one observation file.
+# Parameters: str (input file), int (number of runs per stage), str (directory for the report file).
+# Returns a tuple: dict {stage name : timings}, dict of sizes (locations, records, report bytes).
+def benchmark_file(file_name, repeat_int, directory):
+    stages = {}
+    stages["parse"], records = time_stage(lambda: read_records(file_name), repeat_int)
+    locations = records.locations()
+    stages["split"], split_list = time_stage(lambda: [split_records(records, location) for location in locations],
+                                             repeat_int)
+
+    def compute():
+        index_list = []
+        for count_list, species_list in split_list:
+            try:
+                index_list.append(calculate_index(count_list))
+            except ZeroDivisionError:  # Fewer than two birds.
+                index_list.append(float("nan"))
+        return index_list
+
+    stages["compute"], index_list = time_stage(compute, repeat_int)
+    report_file = os.path.join(directory, "diversity_index.txt")
+
+    def write():
+        with ReportWriter(report_file) as writer:
+            for location, (count_list, species_list), index_float in zip(locations, split_list, index_list):
+                writer.write_location(count_list, species_list, index_float, location)
+        return os.path.getsize(report_file)
+
+    stages["write"], report_size = time_stage(write, repeat_int)
+    try:
+        from SDI_batch import records_batch_index
+    except ImportError:  # NumPy is not installed.
+        pass
+    else:
+        stages["batch"], _ = time_stage(lambda: records_batch_index(records), repeat_int)
+    return stages, {"locations": len(locations), "records": len(records.count_list), "report_bytes": report_size}
+
+
+# Generates observation files and times the pipeline on each of them.
+# Parameter is the parsed command line arguments.
+# Returns the results as a dict (ready to be written as JSON).
+def run_benchmark(arguments):
+    results = {"python": platform.python_version(), "platform": platform.platform(),
+               "settings": {"richness": arguments.richness, "distribution": arguments.distribution,
+                            "mean_count": arguments.mean_count, "seed": arguments.seed, "repeat": arguments.repeat},
+               "sizes": {}}
+    with tempfile.TemporaryDirectory(prefix="sdi_benchmark_") as directory:
+        for location_count in arguments.locations:
+            file_name = os.path.join(directory, f"observations_{location_count}.txt")
+            size_int = generate_observations(file_name, location_count, arguments.richness[0], arguments.richness[1],
+                                             arguments.distribution, arguments.mean_count, arguments.seed)
+            stages, counts = benchmark_file(file_name, arguments.repeat, directory)
+            counts["input_bytes"] = size_int
+            results["sizes"][str(location_count)] = {"counts": counts, "stages": stages}
+            os.remove(file_name)
+            summary = ", ".join(f"{stage} {timings['min']:.4f}s" for stage, timings in stages.items())
+            print(f"{location_count} locations: {summary}")
+    return results
+
+
+# Compares results with a previous run and prints stages that got slower.
+# Median times of the --repeat runs are compared, which are less sensitive to one lucky run than the minimum.
+# Parameters: dict (current results), dict (previous results), float (slowdown ratio counted as a regression),
+# float (smallest slowdown in seconds counted as a regression).
+# Returns the list of (size, stage, ratio) regressions.
+def compare_results(results, previous, threshold_float=REGRESSION_THRESHOLD, noise_float=NOISE_FLOOR):
+    regressions = []
+    for size, size_results in results["sizes"].items():
+        previous_stages = previous.get("sizes", {}).get(size, {}).get("stages", {})
+        for stage, timings in size_results["stages"].items():
+            if stage not in previous_stages or previous_stages[stage]["median"] == 0:
+                continue
+            previous_float = previous_stages[stage]["median"]
+            ratio_float = timings["median"] / previous_float
+            slower = ratio_float > threshold_float and timings["median"] - previous_float > noise_float
+            flag = "  REGRESSION" if slower else ""
+            print(f"{size} locations, {stage}: {ratio_float:.2f}x previous run{flag}")
+            if flag:
+                regressions.append((size, stage, ratio_float))
+    return regressions
+
+
+# Reads command line arguments. Parameter is a list of str (None to use sys.argv).
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SDI pipeline on synthetic observation files.")
+    parser.add_argument("-n", "--locations", type=int, nargs="+", default=LOCATION_COUNTS,
+                        help="numbers of locations to benchmark (default: %(default)s)")
+    parser.add_argument("--richness", type=int, nargs=2, default=[5, 40], metavar=("MIN", "MAX"),
+                        help="number of species per location (default: %(default)s)")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="geometric",
+                        help="bird count distribution (default: %(default)s)")
+    parser.add_argument("--mean-count", type=float, default=5.0, help="mean bird count (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, min and median are kept (default: %(default)s)")
+    parser.add_argument("--json", default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="compare with results of a previous run (JSON file)")
+    parser.add_argument("--noise-floor", type=float, default=NOISE_FLOOR,
+                        help="slowdowns smaller than this many seconds are not regressions (default: %(default)s)")
+    parser.add_argument("--generate", default=None, metavar="FILE",
+                        help="only generate an observation file with the first number of locations")
+    return parser.parse_args(argv)
+
+
+# Runs the benchmark from the command line. Parameter is a list of str (None to use sys.argv).
+# Returns the exit status: 1 if a stage is slower than in the compared run, 0 otherwise.
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    if arguments.generate is not None:
+        size_int = generate_observations(arguments.generate, arguments.locations[0], arguments.richness[0],
+                                         arguments.richness[1], arguments.distribution, arguments.mean_count,
+                                         arguments.seed)
+        print(f"Generated {arguments.generate} ({arguments.locations[0]} locations, {size_int} bytes).")
+        return 0
+    results = run_benchmark(arguments)
+    if arguments.json is not None:
+        with open(arguments.json, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+    if arguments.compare is not None:
+        with open(arguments.compare) as input_file:
+            if compare_results(results, json.load(input_file), REGRESSION_THRESHOLD, arguments.noise_floor):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+## Compiled binary cache of observation records, so large input files are only parsed once.
+## The cache holds an interned species table (each species name stored once), a location table,
+## int32 columns of species ids and bird counts, and per-location offsets into those columns.
+## Later runs memory-map the cache instead of parsing text: nothing is read until it is used, and
+## columns are shared with the page cache instead of being copied into Python lists.
+## The cache stores the source file's modification time and size, and is rebuilt when they change.
+## Usage: python SDI_cache.py [input file] [-o cache file]
+
+
+## LOADING THE LIBRARIES
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+from SDI_calculator import INPUT_FILE, read_records
+
+
+## DEFINING CONSTANTS
+CACHE_SUFFIX = ".sdicache"  # Default cache file: input file name + suffix.
+MAGIC = b"SDICACHE"
+VERSION = 1
+BYTE_ORDER = {"little": 1, "big": 2}[sys.byteorder]  # Columns are stored in native byte order.
+# Magic, version, byte order, source modification time (ns), source size, number of locations, species, records.
+HEADER = struct.Struct("<8sIIqqqqq")
+ALIGNMENT = 8  # Sections start on a multiple of 8 bytes so that they can be cast to int columns.
+
+
+## DEFINING FUNCTIONS
+# Returns the default cache file name for an input file. Parameter is a str (input file's name).
+def cache_name(file_name):
+    return file_name + CACHE_SUFFIX
+
+
+# Returns the (modification time in ns, size in bytes) of a file. Parameter is a str (file's name).
+def source_stat(file_name):
+    stat_result = os.stat(file_name)
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+# Returns a table of str as two arrays: offsets (int64, one more than the number of str) and UTF-8 bytes.
+# Parameter is a list of str.
+def string_table(strings):
+    offsets = array("q", [0])
+    encoded = bytearray()
+    for a_str in strings:
+        encoded += a_str.encode("utf-8")
+        offsets.append(len(encoded))
+    return offsets, bytes(encoded)
+
+
+# Parses an input file and writes its compiled cache (to a temporary file, renamed when complete).
+# Parameters: str (input file), str (cache file, None for the default name).
+# Returns the cache file's name.
+# Raises FileNotFoundError if the input file doesn't exist, OverflowError if a bird count doesn't fit in int32.
+def compile_records(file_name=INPUT_FILE, cache_file=None):
+    cache_file = cache_file or cache_name(file_name)
+    stat = source_stat(file_name)  # Taken before reading, so a file changed while compiling is compiled again.
+    records = read_records(file_name)
+    species_ids = {}  # {species name : id}, interned species table.
+    species_column = array("i", [species_ids.setdefault(species, len(species_ids)) for species in records.species_list])
+    count_column = array("i", records.count_list)
+    location_offsets = array("q", [0])
+    locations = records.locations()
+    for location in locations:
+        location_offsets.append(records.location_index[location][1])
+    location_name_offsets, location_names = string_table(locations)
+    species_name_offsets, species_names = string_table(list(species_ids))
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER, stat[0], stat[1], len(locations), len(species_ids),
+                         len(count_column))
+    sections = [header, location_offsets.tobytes(), count_column.tobytes(), species_column.tobytes(),
+                location_name_offsets.tobytes(), location_names, species_name_offsets.tobytes(), species_names]
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    file_descriptor, temp_name = tempfile.mkstemp(dir=directory, prefix=".sdi_cache_")
+    try:
+        with os.fdopen(file_descriptor, "wb") as output_file:
+            for section in sections:
+                output_file.write(section)
+                output_file.write(b"\0" * (-len(section) % ALIGNMENT))
+        # Temporary files are private (0600): give the cache the old cache's permissions, or make it readable.
+        if os.path.exists(cache_file):
+            shutil.copymode(cache_file, temp_name)
+        else:
+            os.chmod(temp_name, 0o644)
+        os.replace(temp_name, cache_file)
+    except BaseException:
+        os.remove(temp_name)
+        raise
+    return cache_file
+
+
+# Observation records read from a compiled cache file (memory-mapped).
+# Same interface as RecordsIndex (locations, get, location_index, count_list), so it can be used
+# wherever read_records' result is used. count_list is an int32 memoryview, not a list.
+# Raises ValueError if the file is not a cache of this version and byte order.
+class CompiledRecords:
+    def __init__(self, cache_file):
+        with open(cache_file, "rb") as input_file:
+            self._mmap = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise ValueError(f"{cache_file} is not a valid SDI cache file.") from None
+        self._location_index = None
+        self._species_names = None
+
+    # Reads the header and creates views over the sections.
+    def _read_header(self):
+        magic, version, byte_order, mtime_int, size_int, location_count, species_count, record_count = \
+            HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER:
+            raise ValueError
+        self.source_stat = (mtime_int, size_int)
+        self._views = []
+        position_int = HEADER.size
+        position_int = self._section(position_int, (location_count + 1) * 8)
+        self.location_offsets = self._views[-1].cast("q")
+        position_int = self._section(position_int, record_count * 4)
+        self.count_list = self._views[-1].cast("i")
+        position_int = self._section(position_int, record_count * 4)
+        self.species_column = self._views[-1].cast("i")
+        position_int = self._section(position_int, (location_count + 1) * 8)
+        location_name_offsets = self._views[-1].cast("q")
+        position_int = self._section(position_int, location_name_offsets[-1])
+        self._location_names = (location_name_offsets, self._views[-1])
+        position_int = self._section(position_int, (species_count + 1) * 8)
+        species_name_offsets = self._views[-1].cast("q")
+        self._section(position_int, species_name_offsets[-1])
+        self._species_table = (species_name_offsets, self._views[-1])
+        self._views.extend([self.location_offsets, self.count_list, self.species_column,
+                            location_name_offsets, species_name_offsets])
+
+    # Adds a view of one section to self._views. Parameters: int (start), int (length in bytes).
+    # Returns the start of the next section.
+    def _section(self, position_int, length_int):
+        if position_int + length_int > len(self._mmap):
+            raise ValueError
+        self._views.append(memoryview(self._mmap)[position_int:position_int + length_int])
+        return position_int + length_int + (-length_int % ALIGNMENT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Releases the memory map. Records cannot be used afterwards.
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    # {location name : (start, end)} in count_list and species_column, decoded on first use.
+    @property
+    def location_index(self):
+        if self._location_index is None:
+            offsets, names = self._location_names
+            self._location_index = {}
+            for i in range(len(self.location_offsets) - 1):
+                location = str(names[offsets[i]:offsets[i + 1]], "utf-8")
+                self._location_index[location] = (self.location_offsets[i], self.location_offsets[i + 1])
+        return self._location_index
+
+    # List of species names, index is the species id. Decoded on first use.
+    @property
+    def species_names(self):
+        if self._species_names is None:
+            offsets, names = self._species_table
+            self._species_names = [str(names[offsets[i]:offsets[i + 1]], "utf-8") for i in range(len(offsets) - 1)]
+        return self._species_names
+
+    # Returns the names of all locations in the records, in file order.
+    def locations(self):
+        return list(self.location_index)
+
+    def __len__(self):
+        return len(self.location_offsets) - 1
+
+    def __contains__(self, a_string):
+        return a_string in self.location_index
+
+    # Returns records of one location as a tuple of two lists: bird counts (int) and species names (str).
+    # Parameter is a str (location's name).
+    # Raises ValueError if the location is not in the records.
+    def get(self, a_string):
+        try:
+            start_int, end_int = self.location_index[a_string]
+        except KeyError:
+            raise ValueError(f"{a_string} is not in the observation records.") from None
+        species_names = self.species_names
+        species_list = [species_names[species_id] for species_id in self.species_column[start_int:end_int]]
+        return self.count_list[start_int:end_int].tolist(), species_list
+
+
+# Returns the records of an input file from its compiled cache, compiling it first if the cache is
+# missing, invalid or older than the input file (different modification time or size).
+# Parameters: str (input file), str (cache file, None for the default name).
+# Returns a CompiledRecords.
+# Raises FileNotFoundError if the input file doesn't exist.
+def load_compiled(file_name=INPUT_FILE, cache_file=None):
+    cache_file = cache_file or cache_name(file_name)
+    stat = source_stat(file_name)
+    try:
+        records = CompiledRecords(cache_file)
+    except (FileNotFoundError, ValueError):
+        records = None
+    if records is not None and records.source_stat == stat:
+        return records
+    if records is not None:
+        records.close()
+    return CompiledRecords(compile_records(file_name, cache_file))
+
+
+# Compiles an input file from the command line. Parameter is a list of str (None to use sys.argv).
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile observation records to a binary cache.")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="observation records (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=None, help="cache file (default: input file + " + CACHE_SUFFIX + ")")
+    arguments = parser.parse_args(argv)
+    try:
+        cache_file = compile_records(arguments.input_file, arguments.output)
+    except FileNotFoundError:
+        print(f"Error: The file {arguments.input_file} doesn't exist or cannot be accessed by the program.",
+              file=sys.stderr)
+        return 1
+    print(f"Compiled {arguments.input_file} to {cache_file}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
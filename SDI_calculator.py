@@ -0,0 +1,366 @@
+## Headless engine of the SDI calculator (no GUI dependency).
+## Reads observation records of birds (species name and number of individuals), calculates
+## Simpson's Diversity Index (SDI) per location, writes records and indices to a text report
+## and recommends the location with the highest SDI.
+## Used by SDI_calculator_GUI.py (Tk client) and SDI_calculator_CLI.py (batch command line).
+## Errors are raised (FileNotFoundError, ValueError, ZeroDivisionError, PermissionError),
+## callers decide how to show them to the user.
+## Input file: observation_records.txt
+## Output file: diversity_index.txt
+
+
+## LOADING THE LIBRARIES
+import hashlib
+import os
+
+from SDI_profiling import instrumented
+from SDI_ranking import top_locations
+from SDI_report import ReportWriter
+
+
+## DEFINING CONSTANTS
+MULTIPLICATION_FACTOR = 1000  # To display index more accurately in a readable way.
+INPUT_FILE = "observation_records.txt"
+OUTPUT_FILE = "../diversity_index.txt"
+END_MARKER = "END"  # Last line of the input file, after the last location's records.
+HASH_CHUNK_SIZE = 1024 * 1024  # Bytes read at a time when hashing the input file.
+NEWLINE = rb"(?:\r\n|\r(?!\n)|\n)"  # Line end in raw file content (bytes regex): LF, CRLF or CR, as open() reads them.
+
+## DEFINING DATA STRUCTURES
+locations_list = ["Black Mountain Nature Reserve", "Lake Ginninderra (John Knight Memorial Park)",
+                  "University of Canberra", "Australian National University", "Australian National Botanic Gardens"]
+
+## DEFINING ERROR MESSAGES - shared by GUI and command line
+INPUT_ERROR_MSG = "Error: The file observation_records.txt doesn't exist or cannot be accessed by the program."
+RECORDS_ERROR_MSG = "Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous."
+INDEX_ERROR_MSG = "Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count."
+OUTPUT_ERROR_MSG = "Error: The program couldn't access or create diversity_index.txt."
+
+
+## DEFINING FUNCTIONS
+# Splits decoded file content into lines the way open() does in text mode (universal newlines: LF, CRLF
+# and CR all end a line), so that content read as bytes is parsed like read_records parses the file.
+# Parameter is a str. Returns a list of str (lines without line ends).
+def split_lines(text):
+    return text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+
+
+# Observation records of all locations, parsed in a single pass over the input file.
+# Bird counts (int) and species names (str) of every location are stored back to back in two flat lists.
+# location_index maps each location's name to its (start, end) slice in those lists,
+# so the records of any location are found in O(1) without scanning the file again.
+class RecordsIndex:
+    def __init__(self):
+        self.count_list = []  # Bird counts (int) of all locations.
+        self.species_list = []  # Species names (str) of all locations, same index as matching count.
+        self.location_index = {}  # {location name : (start, end)} in count_list and species_list.
+        self.end_found = False  # True once END_MARKER was read (lines after it are ignored).
+        self.bytes_read = 0  # Size of the input file (set by read_records).
+
+    # Returns the names of all locations in the records, in file order.
+    def locations(self):
+        return list(self.location_index)
+
+    # Returns the number of locations in the records.
+    def __len__(self):
+        return len(self.location_index)
+
+    # Checks if a location is in the records. Parameter is a str (location's name).
+    def __contains__(self, a_string):
+        return a_string in self.location_index
+
+    # Adds records read from an iterable of lines (str, with or without line ending).
+    # In the input, each location records start with location name and end with an empty line.
+    # Digit lines are bird counts, other lines are species names.
+    # Stops at END_MARKER. If a location appears twice, only its first records are kept.
+    def add_lines(self, lines):
+        location = None  # Location whose records are being read (None between locations).
+        start_int = 0
+        for line in lines:
+            item = line.rstrip("\r\n")
+            if item == "":  # Empty line separates records for different locations.
+                location = self._close_location(location, start_int)
+            elif location is None:  # First line of a block is the location's name.
+                if item == END_MARKER:
+                    self.end_found = True
+                    break
+                if item in self.location_index:  # Skip duplicate location's records.
+                    location = ""
+                else:
+                    location = item
+                    start_int = len(self.count_list)
+                    self.location_index[location] = (start_int, start_int)
+            elif location == "":  # Inside a duplicate location's records.
+                continue
+            elif item.isdigit():  # Digits are birds counts.
+                self.count_list.append(int(item))
+            else:  # Other strings are species names.
+                self.species_list.append(item)
+        self._close_location(location, start_int)
+        return self
+
+    # Records the end of a location's records in location_index. Returns None (no location being read).
+    def _close_location(self, location, start_int):
+        if location:
+            # Keep both lists the same length (unpaired count or species name is dropped).
+            end_int = min(len(self.count_list), len(self.species_list))
+            del self.count_list[end_int:]
+            del self.species_list[end_int:]
+            self.location_index[location] = (start_int, end_int)
+        return None
+
+    # Returns records of one location as a tuple of two lists: bird counts (int) and species names (str).
+    # Parameter is a str (location's name).
+    # Raises ValueError if the location is not in the records.
+    def get(self, a_string):
+        try:
+            start_int, end_int = self.location_index[a_string]
+        except KeyError:
+            raise ValueError(f"{a_string} is not in the observation records.") from None
+        return self.count_list[start_int:end_int], self.species_list[start_int:end_int]
+
+
+# Reads observation records from text file in a single pass and indexes them by location.
+# Parameter is the input file's name.
+# Returns a RecordsIndex.
+# Raises FileNotFoundError if the input file doesn't exist.
+@instrumented("read_records", lambda args, kwargs, result: (result.bytes_read, len(result.count_list)))
+def read_records(file_name=INPUT_FILE):
+    with open(file_name, "r") as input_file:
+        records = RecordsIndex().add_lines(input_file)
+        records.bytes_read = os.fstat(input_file.fileno()).st_size
+    return records
+
+
+# Returns the SHA-1 hash (hexadecimal str) of a file's content.
+# Parameter is the file's name.
+def file_hash(file_name):
+    sha1 = hashlib.sha1()
+    with open(file_name, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(HASH_CHUNK_SIZE), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+# Keeps the parsed records of one input file in memory and reads the file again only when it changed.
+# The file's modification time and size are checked on every call; if either changed, the content hash
+# is compared too, so a file that was only touched or rewritten with the same content is not parsed again.
+# hits and misses count calls answered from memory and calls that had to read the file.
+class RecordStore:
+    def __init__(self, file_name=INPUT_FILE):
+        self.file_name = file_name
+        self.hits = 0
+        self.misses = 0
+        self._records = None  # RecordsIndex of the last read.
+        self._stat = None  # (modification time in ns, size in bytes) of the last read.
+        self._hash = None  # Content hash of the last read.
+
+    # Returns the RecordsIndex of the input file, read again only if the file changed.
+    # Raises FileNotFoundError if the input file doesn't exist.
+    def records(self):
+        stat_result = os.stat(self.file_name)
+        stat = (stat_result.st_mtime_ns, stat_result.st_size)
+        if self._records is not None and stat == self._stat:
+            self.hits += 1
+            return self._records
+        hash_str = file_hash(self.file_name)
+        if self._records is not None and hash_str == self._hash:  # Touched but content unchanged.
+            self._stat = stat
+            self.hits += 1
+            return self._records
+        self.misses += 1
+        self._records = read_records(self.file_name)
+        self._stat = stat
+        self._hash = hash_str
+        return self._records
+
+    # Forgets the records in memory, so the next call to records() reads the file.
+    def clear(self):
+        self._records = None
+        self._stat = None
+        self._hash = None
+
+    # Returns cache statistics as a str, for display.
+    def cache_info(self):
+        return f"Records cache: {self.hits} hits, {self.misses} misses."
+
+
+# Returns the names of all locations in the records, in file order.
+# Parameter is a RecordsIndex (as returned by read_records).
+def list_locations(records):
+    return records.locations()
+
+
+# Creates records lists for one location.
+# Generates two lists stored in tuple: one with bird count (int), one with species name (str).
+# Matching species and count are at same index in each list.
+# Parameters: RecordsIndex (all records), str (location's name).
+# Raises ValueError if the location is not in the records.
+@instrumented("split_records", lambda args, kwargs, result: (0, len(result[0])))
+def split_records(records, a_string):
+    return records.get(a_string)
+
+
+# Calculates SDI from list of bird counts.
+# Parameter is a list of integers.
+# Raises ZeroDivisionError if there are fewer than two birds in total (erroneous records).
+@instrumented("calculate_index", lambda args, kwargs, result: (0, len(args[0])))
+def calculate_index(records_list):
+    sum_records_int = 0
+    total_birds_int = 0
+    for bird_count_int in records_list:
+        sum_records_int += (bird_count_int - 1) * bird_count_int
+        total_birds_int += bird_count_int
+    return index_from_totals(sum_records_int, total_birds_int)
+
+
+# Calculates SDI from the totals of a location's records.
+# Parameters: int (sum of n(n-1) over all species), int (total number of birds N).
+# Raises ZeroDivisionError if there are fewer than two birds in total.
+def index_from_totals(sum_records_int, total_birds_int):
+    return (1 - (sum_records_int / (total_birds_int * (total_birds_int - 1)))) * MULTIPLICATION_FACTOR
+
+
+# Keeps running totals of one location's records, so the SDI is known after every entry without a recompute.
+# Species are stored once: a repeated species' count is added to its previous count.
+# Adding, editing and removing a species count are O(1).
+class IndexAccumulator:
+    def __init__(self):
+        self.species_dict = {}  # {species name : bird count}, in entry order.
+        self.sum_records_int = 0  # Sum of n(n-1) over all species.
+        self.total_birds_int = 0  # Total number of birds (N).
+
+    # Returns the number of species entered.
+    def __len__(self):
+        return len(self.species_dict)
+
+    # Checks if a species was entered. Parameter is a str (species name).
+    def __contains__(self, a_string):
+        return a_string in self.species_dict
+
+    # Removes a bird count's contribution from the running totals. Parameter is an int.
+    def _subtract(self, bird_count_int):
+        self.sum_records_int -= (bird_count_int - 1) * bird_count_int
+        self.total_birds_int -= bird_count_int
+
+    # Adds a bird count's contribution to the running totals. Parameter is an int.
+    def _add(self, bird_count_int):
+        self.sum_records_int += (bird_count_int - 1) * bird_count_int
+        self.total_birds_int += bird_count_int
+
+    # Adds a species count. If the species was already entered, counts are merged.
+    # Parameters: str (species name), int (bird count, 1 or greater).
+    # Returns the species' total count.
+    def add(self, species_str, bird_count_int):
+        return self.edit(species_str, self.species_dict.get(species_str, 0) + bird_count_int)
+
+    # Replaces a species' count (adds the species if it wasn't entered).
+    # Parameters: str (species name), int (bird count, 1 or greater).
+    # Returns the species' new count.
+    # Raises ValueError if the count is lower than 1.
+    def edit(self, species_str, bird_count_int):
+        if bird_count_int < 1:
+            raise ValueError("Number of observed birds must be 1 or greater.")
+        if species_str in self.species_dict:
+            self._subtract(self.species_dict[species_str])
+        self.species_dict[species_str] = bird_count_int
+        self._add(bird_count_int)
+        return bird_count_int
+
+    # Removes a species and its count.
+    # Parameter is a str (species name).
+    # Raises KeyError if the species wasn't entered.
+    def remove(self, species_str):
+        self._subtract(self.species_dict.pop(species_str))
+
+    # Removes all records (to enter records for a new location).
+    def clear(self):
+        self.species_dict = {}
+        self.sum_records_int = 0
+        self.total_birds_int = 0
+
+    # Returns current records as a tuple of two lists: bird counts (int) and species names (str).
+    def records(self):
+        return list(self.species_dict.values()), list(self.species_dict)
+
+    # Returns the current SDI, same result as calculate_index over the current counts.
+    # Raises ZeroDivisionError if there are fewer than two birds in total.
+    def index(self):
+        return index_from_totals(self.sum_records_int, self.total_birds_int)
+
+
+# Creates or clears the output text file.
+# Parameter is the output file's name.
+def clear_output(file_name=OUTPUT_FILE):
+    open(file_name, "w").close()
+
+
+# Writes observations records and diversity index to a text file.
+# Observations are displayed in a table style.
+# Parameters: list of int (bird count), list of str (species), float (SDI), str (location name), str (output file).
+# To write many locations, open one ReportWriter (SDI_report.py) and pass it to create_dict_index instead.
+@instrumented("write_observations", lambda args, kwargs, result: (0, len(args[1])))
+def write_observations(count_list, species_list, a_float, a_str, file_name=OUTPUT_FILE):
+    with ReportWriter(file_name, mode="a") as writer:
+        writer.write_location(count_list, species_list, a_float, a_str)
+
+
+# Calls all functions involved in calculating index and writing result to output file for a single location.
+# Parameters: RecordsIndex (all records), str (location name), dict (updated with {location name : SDI}),
+# str (output file, or None to skip writing), ReportWriter (if given, used instead of the output file).
+# Returns the location's SDI.
+def create_dict_index(records, a_string, index_dict, file_name=OUTPUT_FILE, writer=None):
+    count_list, species_list = split_records(records, a_string)
+    index_float = calculate_index(count_list)
+    if writer is not None:
+        writer.write_location(count_list, species_list, index_float, a_string)
+    elif file_name is not None:
+        write_observations(count_list, species_list, index_float, a_string, file_name)
+    index_dict[a_string] = index_float
+    return index_float
+
+
+# Raised by create_all_indices when a calculation is cancelled before all locations were processed.
+class CalculationCancelled(Exception):
+    pass
+
+
+# Calls create_dict_index for each location, reporting progress and checking for cancellation between locations.
+# Parameters: RecordsIndex (all records), list of str (location names), dict (updated with {location name : SDI}),
+# ReportWriter (or None to skip writing), function called with (locations processed, total locations) after
+# each location (or None), threading.Event (calculation stops when it is set, or None).
+# Returns the list of locations whose SDI could not be calculated (fewer than two birds).
+# Raises ValueError if a location is not in the records, CalculationCancelled if cancel_event was set.
+def create_all_indices(records, locations, index_dict, writer=None, progress=None, cancel_event=None):
+    failed_list = []
+    total_int = len(locations)
+    for done_int, location in enumerate(locations, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CalculationCancelled(f"Cancelled after {done_int - 1} of {total_int} locations.")
+        try:
+            create_dict_index(records, location, index_dict, None, writer)
+        except ZeroDivisionError:  # Erroneous records.
+            failed_list.append(location)
+        if progress is not None:
+            progress(done_int, total_int)
+    return failed_list
+
+
+# Finds highest SDI (value) and corresponding location name (key) in dictionary, then writes the recommendation.
+# Parameters: dict {location name : SDI}, str (output file, or None to skip writing),
+# ReportWriter (if given, used instead of the output file).
+# Returns the recommended location's name.
+# Raises ValueError if the dictionary is empty (or all SDIs are NaN).
+# To rank more than one location, use RankingEngine (SDI_ranking.py).
+@instrumented("location_recommendation", lambda args, kwargs, result: (0, len(args[0])))
+def location_recommendation(index_dict, file_name=OUTPUT_FILE, writer=None):
+    best_list = top_locations(index_dict, 1)  # Finds place with highest SDI.
+    if not best_list:
+        raise ValueError("No SDI to recommend a location.")
+    recommended_place = best_list[0][0]
+    if writer is not None:
+        writer.write_recommendation(recommended_place, index_dict[recommended_place])
+    elif file_name is not None:
+        with ReportWriter(file_name, mode="a") as writer:
+            writer.write_recommendation(recommended_place, index_dict[recommended_place])
+    return recommended_place
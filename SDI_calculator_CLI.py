@@ -0,0 +1,296 @@
+## Command line client of the SDI calculator, for batch runs without a display.
+## Calculates the SDI of every location in an observation file in one process and prints
+## one "location<TAB>SDI" line per location. Optionally writes the records and indices
+## report (same layout as the GUI, CSV or JSON Lines) and a recommendation for a walk.
+## With --vectorized, all SDIs are calculated in one NumPy pass (SDI_batch.py, NumPy is only loaded then).
+## With --jobs, the input file is split and parsed by several processes (SDI_parallel.py); only indices
+## are calculated then, so no records report can be written.
+## With --cache, records are read from a compiled binary cache of the input file (SDI_cache.py),
+## built on the first run and rebuilt when the input file changes.
+## With --top or --bottom, only the k best (or worst) locations are printed, best (or worst) first,
+## optionally among locations whose name starts with --prefix.
+## With --profile, time, calls, bytes and records of each pipeline stage are printed to stderr at the end
+## (SDI_profiling.py); --cprofile writes cProfile statistics of the whole run to a file.
+## With --metrics, other diversity metrics (SDI_diversity.py) are calculated in the same pass as the SDI,
+## printed after it and written to the report; --rank-by ranks and recommends locations by one of them.
+## With --bootstrap, a confidence interval of each SDI (bootstrap) and of each SDI rarefied to a common
+## number of birds is printed after it (SDI_uncertainty.py, NumPy is only loaded then), and the
+## recommendation lists the locations that are statistically indistinguishable from the recommended one.
+## Usage: python SDI_calculator_CLI.py [input file] [-o output file] [-l location ...] [-r] [-f format] [--atomic]
+##                                     [--cache] [--vectorized | -j jobs] [--top k | --bottom k] [--prefix prefix]
+##                                     [--metrics metric,... | --metrics all] [--rank-by metric]
+##                                     [--bootstrap resamples] [--confidence level] [--rarefy size] [--seed seed]
+##                                     [--profile] [--cprofile file]
+
+
+## LOADING THE LIBRARIES
+import argparse
+import sys
+from contextlib import nullcontext
+
+from SDI_calculator import (INPUT_FILE, INPUT_ERROR_MSG, INDEX_ERROR_MSG, OUTPUT_ERROR_MSG, RECORDS_ERROR_MSG,
+                            create_dict_index, list_locations, location_recommendation, read_records, split_records)
+from SDI_diversity import METRICS, check_metrics, create_diversity_dict, metric_dict, metric_recommendation
+from SDI_profiling import StageStats, add_hook, remove_hook
+from SDI_ranking import RankingEngine
+from SDI_report import REPORT_FORMATS, ReportWriter, format_metric
+
+
+## DEFINING FUNCTIONS
+# Reads the --metrics argument. Parameter is a str (comma-separated metric names, or "all").
+# Returns a list of str (metric names). Raises argparse.ArgumentTypeError for an unknown metric.
+def parse_metrics(a_str):
+    if a_str == "all":
+        return list(METRICS)
+    try:
+        return check_metrics([metric.strip() for metric in a_str.split(",") if metric.strip()])
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from None
+
+
+# Reads command line arguments. Parameter is a list of str (None to use sys.argv).
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate Simpson's Diversity Index for each location of an observation file.")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="observation records (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=None, help="write records and indices report to this file")
+    parser.add_argument("-l", "--location", action="append", dest="locations", default=None,
+                        help="location to calculate (can be repeated, default: all locations in the file)")
+    parser.add_argument("-r", "--recommend", action="store_true", help="recommend the location with the highest SDI")
+    parser.add_argument("-f", "--format", choices=sorted(REPORT_FORMATS), default="table",
+                        help="report format (default: %(default)s)")
+    parser.add_argument("--atomic", action="store_true",
+                        help="write the report to a temporary file, renamed to the output file when complete")
+    ranking = parser.add_mutually_exclusive_group()
+    ranking.add_argument("--top", type=int, default=None, help="print only the k locations with the highest SDI")
+    ranking.add_argument("--bottom", type=int, default=None, help="print only the k locations with the lowest SDI")
+    parser.add_argument("--prefix", default=None, help="rank only locations whose name starts with this prefix")
+    parser.add_argument("--metrics", type=parse_metrics, default=None,
+                        help=f"other diversity metrics to calculate, comma-separated or all ({', '.join(METRICS)})")
+    parser.add_argument("--rank-by", choices=METRICS, default=None,
+                        help="metric used by --top, --bottom and --recommend (default: simpson, the SDI)")
+    parser.add_argument("--bootstrap", type=int, default=None, metavar="RESAMPLES",
+                        help="print confidence intervals from this many resamples per location")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of --bootstrap (default: %(default)s)")
+    parser.add_argument("--rarefy", type=int, default=None, metavar="SIZE",
+                        help="number of birds of rarefied resamples (default: smallest number of birds of a location)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random resamples (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true", help="print time spent in each pipeline stage to stderr")
+    parser.add_argument("--cprofile", default=None, metavar="FILE", help="write cProfile statistics to this file")
+    parser.add_argument("--cache", action="store_true",
+                        help="read records from a compiled cache of the input file (built if missing or outdated)")
+    calculation = parser.add_mutually_exclusive_group()
+    calculation.add_argument("--vectorized", action="store_true", help="calculate all SDIs in one NumPy pass")
+    calculation.add_argument("-j", "--jobs", type=int, default=None,
+                             help="parse and calculate with this many processes (0: one per CPU)")
+    arguments = parser.parse_args(argv)
+    for option, k in (("--top", arguments.top), ("--bottom", arguments.bottom)):
+        if k is not None and k < 1:
+            parser.error(f"{option} needs at least one location")
+    if arguments.jobs is not None and arguments.jobs < 0:
+        parser.error("--jobs must be 0 (one process per CPU) or more")
+    if arguments.jobs is not None and arguments.output is not None:
+        parser.error("a records report (-o) cannot be written with --jobs, which only calculates indices")
+    if arguments.jobs is not None and arguments.cache:
+        parser.error("--cache cannot be used with --jobs, which parses the input file itself")
+    if arguments.jobs is not None and (arguments.metrics is not None or arguments.rank_by is not None):
+        parser.error("--metrics and --rank-by cannot be used with --jobs, which only calculates SDIs")
+    if arguments.bootstrap is not None and arguments.jobs is not None:
+        parser.error("--bootstrap cannot be used with --jobs, which only calculates SDIs")
+    if arguments.bootstrap is not None and arguments.bootstrap < 1:
+        parser.error("--bootstrap needs at least one resample")
+    if arguments.bootstrap is not None and arguments.rank_by not in (None, "simpson"):
+        parser.error("--bootstrap only gives intervals of the SDI, it cannot be used with --rank-by")
+    if arguments.rarefy is not None and arguments.rarefy < 2:
+        parser.error("--rarefy needs at least two birds per resample")
+    if not 0 < arguments.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+    if arguments.rank_by is not None:  # The ranking metric is calculated as well.
+        arguments.metrics = arguments.metrics or []
+        if arguments.rank_by not in arguments.metrics:
+            arguments.metrics.append(arguments.rank_by)
+    return arguments
+
+
+# Looks up a location in the results of the vectorized or parallel pass.
+# Parameters: str (location name), dict {location name : result} (batch results),
+# str (metric name of the SDI in each result, None if the results are SDIs).
+# Returns the location's result. Raises ValueError (unknown location) or ZeroDivisionError (SDI is NaN).
+def batch_result(a_string, batch_dict, metric=None):
+    if a_string not in batch_dict:
+        raise ValueError(f"{a_string} is not in the observation records.")
+    result = batch_dict[a_string]
+    index_float = result if metric is None else result[metric]
+    if index_float != index_float:  # NaN: fewer than two birds.
+        raise ZeroDivisionError(f"The SDI of {a_string} could not be calculated.")
+    return result
+
+
+# Same as create_dict_index, with the SDI taken from the results of the vectorized or parallel pass.
+# Parameters: RecordsIndex (None if no writer), str (location name), dict {location name : SDI} (batch results),
+# dict (updated with {location name : SDI}), ReportWriter (or None to skip writing).
+# Returns the location's SDI. Raises ValueError (unknown location) or ZeroDivisionError (SDI is NaN).
+def vectorized_dict_index(records, a_string, batch_dict, index_dict, writer):
+    index_float = batch_result(a_string, batch_dict)
+    if writer is not None:
+        count_list, species_list = split_records(records, a_string)
+        writer.write_location(count_list, species_list, index_float, a_string)
+    index_dict[a_string] = index_float
+    return index_float
+
+
+# Same as create_diversity_dict, with the metrics taken from the results of the vectorized pass.
+# Parameters: RecordsIndex, str (location name), dict {location name : {metric name : value}} (batch results),
+# dict (updated with {location name : SDI}), dict (updated with {location name : {metric name : value}}),
+# ReportWriter (or None to skip writing).
+# Returns the location's metrics. Raises ValueError (unknown location) or ZeroDivisionError (SDI is NaN).
+def vectorized_diversity_dict(records, a_string, batch_dict, index_dict, diversity_dict, writer):
+    result_dict = batch_result(a_string, batch_dict, "simpson")
+    if writer is not None:
+        count_list, species_list = split_records(records, a_string)
+        writer.write_location(count_list, species_list, result_dict["simpson"], a_string, result_dict)
+    index_dict[a_string] = result_dict["simpson"]
+    diversity_dict[a_string] = result_dict
+    return result_dict
+
+
+# Calculates the SDI (and other metrics, if requested) of each location, prints it and writes it to the report.
+# Parameters: RecordsIndex, list of str (location names), dict (updated with {location name : SDI}),
+# ReportWriter (or None to skip writing), dict of batch results (or None to calculate one by one),
+# bool (print each location's SDI), list of str (other metrics, None for SDI only),
+# dict (updated with {location name : {metric name : value}} if metrics are requested),
+# dict {location name : {"low", "high", "rarefied_low", "rarefied_high"}} (intervals to print, or None).
+# Returns the exit status: 0 if every SDI was calculated, 1 otherwise.
+def calculate_locations(records, locations, index_dict, writer, batch_dict=None, print_each=True, metrics=None,
+                        diversity_dict=None, uncertainty_dict=None):
+    status_int = 0
+    for location in locations:
+        try:
+            result_dict = {}
+            if metrics is not None and batch_dict is not None:
+                result_dict = vectorized_diversity_dict(records, location, batch_dict, index_dict, diversity_dict, writer)
+                index_float = result_dict["simpson"]
+            elif metrics is not None:
+                result_dict = create_diversity_dict(records, location, index_dict, diversity_dict, metrics, writer)
+                index_float = result_dict["simpson"]
+            elif batch_dict is not None:
+                index_float = vectorized_dict_index(records, location, batch_dict, index_dict, writer)
+            else:
+                index_float = create_dict_index(records, location, index_dict, None, writer)
+            if print_each:
+                line = f"{location}\t{index_float:.2f}"
+                if uncertainty_dict is not None:
+                    interval = uncertainty_dict[location]
+                    line += (f"\t[{interval['low']:.2f}, {interval['high']:.2f}]"
+                             f"\trarefied [{interval['rarefied_low']:.2f}, {interval['rarefied_high']:.2f}]")
+                print(line + "".join(f"\t{metric}={format_metric(value)}" for metric, value in result_dict.items()
+                                     if metric != "simpson"))
+        except ValueError:  # Location is not in the input file.
+            print(f"{location}: {RECORDS_ERROR_MSG}", file=sys.stderr)
+            status_int = 1
+        except ZeroDivisionError:  # Erroneous records (fewer than two birds).
+            print(f"{location}: {INDEX_ERROR_MSG}", file=sys.stderr)
+            status_int = 1
+    return status_int
+
+
+# Runs the batch calculation, with profiling if requested. Parameter is a list of str (None to use sys.argv).
+# Returns the exit status: 0 if every SDI was calculated, 1 otherwise.
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    stage_stats = add_hook(StageStats()) if arguments.profile else None
+    try:
+        if arguments.cprofile is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+            status_int = profiler.runcall(run, arguments)
+            profiler.dump_stats(arguments.cprofile)
+        else:
+            status_int = run(arguments)
+    finally:
+        if stage_stats is not None:
+            remove_hook(stage_stats)
+            print(stage_stats.summary(), file=sys.stderr)
+    return status_int
+
+
+# Runs the batch calculation. Parameter is the parsed command line arguments.
+# Returns the exit status: 0 if every SDI was calculated, 1 otherwise.
+def run(arguments):
+    index_dict = {}
+    diversity_dict = {}
+    records = None
+    batch_dict = None
+    try:
+        if arguments.jobs is not None:
+            from SDI_parallel import parallel_index
+            batch_dict = parallel_index(arguments.input_file, arguments.jobs or None)
+            locations = arguments.locations or list(batch_dict)
+        else:
+            if arguments.cache:
+                from SDI_cache import load_compiled
+                records = load_compiled(arguments.input_file)
+            else:
+                records = read_records(arguments.input_file)
+            locations = arguments.locations or list_locations(records)
+    except (FileNotFoundError, PermissionError):
+        print(INPUT_ERROR_MSG, file=sys.stderr)
+        return 1
+    if arguments.vectorized and arguments.metrics is not None:
+        from SDI_batch import records_batch_diversity
+        batch_dict = records_batch_diversity(records, [location for location in locations if location in records],
+                                             ["simpson"] + [metric for metric in arguments.metrics if metric != "simpson"])
+    elif arguments.vectorized:
+        from SDI_batch import records_batch_index
+        batch_dict = records_batch_index(records, [location for location in locations if location in records])
+    uncertainty_dict = None
+    if arguments.bootstrap is not None:
+        from SDI_uncertainty import records_uncertainty
+        bootstrap_locations = [location for location in locations if location in records]
+        uncertainty_dict, bootstrap_array = records_uncertainty(records, bootstrap_locations, arguments.bootstrap,
+                                                                arguments.confidence, arguments.rarefy, arguments.seed)
+    writer = None
+    try:
+        if arguments.output is not None:  # Output file is opened once for the whole run.
+            writer = ReportWriter(arguments.output, arguments.format, atomic=arguments.atomic)
+        with writer or nullcontext():
+            ranked = arguments.top is not None or arguments.bottom is not None
+            status_int = calculate_locations(records, locations, index_dict, writer, batch_dict, not ranked,
+                                             arguments.metrics, diversity_dict, uncertainty_dict)
+            rank_by = arguments.rank_by or "simpson"
+            if ranked:
+                engine = RankingEngine(metric_dict(diversity_dict, rank_by) if arguments.rank_by else index_dict)
+                if arguments.top is not None:
+                    ranking_list = engine.top(arguments.top, arguments.prefix)
+                else:
+                    ranking_list = engine.bottom(arguments.bottom, arguments.prefix)
+                for location, value in ranking_list:
+                    print(f"{location}\t{format_metric(value, 2)}")
+            if arguments.recommend and arguments.rank_by not in (None, "simpson"):
+                recommended_place = metric_recommendation(diversity_dict, rank_by, None, writer)
+                value = diversity_dict[recommended_place][rank_by]
+                print(f"Go to {recommended_place} for your walk. {rank_by} = {format_metric(value, 2)}.")
+            elif arguments.recommend and arguments.bootstrap is not None:
+                from SDI_uncertainty import uncertain_recommendation
+                recommended_place, tie_list = uncertain_recommendation(records, index_dict, arguments.bootstrap,
+                                                                       arguments.confidence, arguments.seed, None, writer,
+                                                                       bootstrap_array, bootstrap_locations)
+                print(f"Go to {recommended_place} for your walk. SDI = {index_dict[recommended_place]:.2f}.")
+                if tie_list:
+                    print(f"Its SDI cannot be told apart ({arguments.confidence:.0%} confidence) from the SDI of: "
+                          + ", ".join(tie_list) + ".")
+                elif tie_list is not None:
+                    print(f"Its SDI is higher than at every other location ({arguments.confidence:.0%} confidence).")
+            elif arguments.recommend:
+                recommended_place = location_recommendation(index_dict, None, writer)
+                print(f"Go to {recommended_place} for your walk. SDI = {index_dict[recommended_place]:.2f}.")
+    except OSError:  # If the program cannot open/create output text file (no permission, no such directory...).
+        print(OUTPUT_ERROR_MSG, file=sys.stderr)
+        return 1
+    except ValueError:  # No SDI could be calculated, nothing to recommend.
+        print(RECORDS_ERROR_MSG, file=sys.stderr)
+        return 1
+    return status_int
+
+
+if __name__ == "__main__":
+    sys.exit(main())
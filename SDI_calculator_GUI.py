@@ -7,26 +7,45 @@
 ## C - calculate SDIs for a set of five different locations
 ## The program generates a GUI with one root window and three other windows.
 ## It goes from one window to the other as needed to execute the user's chosen option.
+## Parsing, SDI and report logic live in SDI_calculator.py (no GUI dependency); this file is the Tk client.
+## Options B & C run in a worker thread; the GUI shows their progress and can cancel them.
+## If NumPy is installed, option B also says whether the two SDIs can be told apart (SDI_uncertainty.py).
 ## Input file: observation_records.txt
 ## Output file: diversity_index.txt
 
 
-## LOADING THE LIBRARY FOR GUI
+## LOADING THE LIBRARIES
+import queue
+import threading
 from tkinter import *
+from tkinter import ttk
 
+# Parsing, SDI and report logic (no GUI dependency).
+from SDI_calculator import (INDEX_ERROR_MSG, INPUT_ERROR_MSG, OUTPUT_ERROR_MSG, OUTPUT_FILE, RECORDS_ERROR_MSG,
+                            CalculationCancelled, IndexAccumulator, RecordStore, create_all_indices,
+                            location_recommendation, locations_list)
+from SDI_report import ReportWriter
+
+try:  # Bootstrap resampling needs NumPy; without it, option B recommends without uncertainty.
+    from SDI_uncertainty import CONFIDENCE, uncertain_recommendation
+except ImportError:
+    uncertain_recommendation = None
+
+
+## DEFINING CONSTANTS
+POLL_DELAY = 100  # Milliseconds between two checks of the background calculation's progress.
+PROGRESS_STEPS = 200  # Maximum number of progress updates sent by a background calculation.
 
-## DEFINING CONSTANT - to display index more accurately in a readable way
-MULTIPLICATION_FACTOR = 1000
 
 ## DEFINING DATA STRUCTURES
 menu_list = ["Enter records and calculate an index", "Compare two locations and get a recommendation for a walk",
              "Show all existing records and indices"]
-locations_list = ["Black Mountain Nature Reserve", "Lake Ginninderra (John Knight Memorial Park)",
-                  "University of Canberra", "Australian National University", "Australian National Botanic Gardens"]
 index_dict = {}  # Stores location name and index as key : value pair.
-all_records_list = []  # Stores unsorted records from observation_record.txt
-records_species_list = []  # Stores species name (str)
-records_count_list = []  # Stores bird count (int)
+record_store = RecordStore()  # Reads observation_record.txt again only when the file changed (worker thread only)
+job_queue = queue.Queue()  # Messages from the background calculation to the GUI: (kind, value)
+cancel_event = threading.Event()  # Set when user clicks "Cancel" to stop the background calculation
+job_thread = None  # Thread running the background calculation (None if no calculation is running)
+entered_records = IndexAccumulator()  # Stores species name and bird count entered in option A, with running SDI
 
 ## DEFINING VARIABLES
 location_name_str = ""
@@ -36,119 +55,89 @@ index_float = 0.0
 
 
 ## DEFINING FUNCTIONS AND PROCEDURES
-# Reads observation records from text file and stores them in a list for use in options B & C.
-def read_records():
-    try:
-        input_file = open("observation_records.txt", "r")
-    except FileNotFoundError:  # If program could not find input file.
-        outcome.set("Error: The file observation_records.txt doesn't exist or cannot be accessed by the program.")
-    else:
-        for line in input_file:
-            all_records_list.append(line.strip("\n"))
-        input_file.close()
-
-
-# Creates records lists for one location, from all_records_list.
-# Generates two lists stored in tuple: one with bird count (int), one with species name (str).
-# Matching species and count are at same index in each list.
-# Parameter is a string that is the location's name.
-def split_records(a_string):
-    records_list = []
-    records_species_list = []
-    records_count_list = []
-    # Step 1: Create a list that starts at the location's name and stops at the last entered value for it.
-    # In all_records_list, each location records start with location name and ends with an empty str.
-    start_index = all_records_list.index(a_string)
-    for item in all_records_list[start_index:]:
-        if item != "":  # Empty str separate records for different locations.
-            records_list.append(item)
-        else:
-            break
-    # Step 2: Iterate over step 1's list to create a list of species names and a list of bird counts.
-    for item in records_list:
-        if item.isdigit():  # Digits are birds counts.
-            item = int(item)
-            records_count_list.append(item)
-        elif item == a_string:  # Location's name is not appended.
-            continue
-        else:  # Other strings are species names.
-            records_species_list.append(item)
-    return records_count_list, records_species_list
-
-
-# Calculates SDI from list of bird counts.
-# Parameter is a list of integers.
-def calculate_index(records_list):
-    sum_records_int = 0
-    total_birds_int = 0
-    for bird_count_int in records_list:
-        sum_records_int += (bird_count_int - 1) * bird_count_int
-        total_birds_int += bird_count_int
-    try:
-        index_float = (1 - (sum_records_int / (total_birds_int * (total_birds_int - 1)))) * MULTIPLICATION_FACTOR
-        return index_float
-    except ZeroDivisionError:  # Erroneous records could lead to zero division.
-        outcome.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-        msg.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-        message.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-
-
-# Writes observations records and diversity index to a text file.
-# Observations are displayed in a table style.
-# Parameters: list of int (bird count), list of str (species), float (SDI), str (location name).
-def write_observations(count_list, species_list, a_float, a_str):
+# Runs a calculation in the worker thread and sends its outcome to the GUI through job_queue.
+# Messages are ("progress", (done, total)), then ("done", result) or ("error", exception).
+# Parameter is a function taking a progress function and returning the calculation's result.
+def run_job(function):
+    # Sends at most PROGRESS_STEPS progress messages.
+    def report_progress(done_int, total_int):
+        if done_int % max(1, total_int // PROGRESS_STEPS) == 0 or done_int == total_int:
+            job_queue.put(("progress", (done_int, total_int)))
+
     try:
-        records_file = open("../diversity_index.txt", "a")
-        records_file.write("\n\n" + "*" * 70)
-        records_file.write(f"\nObservation records for {a_str}.")  # Title of table.
-        records_file.write("\n" + "*" * 70)
-        for i in range(0, len(species_list)):  # Table style. Matching species and count are at same index in each list.
-            records_file.write(f"\n{species_list[i]}".ljust(40))
-            records_file.write(f"{count_list[i]}".ljust(20))
-        records_file.write(f"\n\nIn {a_str}, SDI = {a_float:.2f}.")  # SDI below the table.
-        records_file.close()
-    except PermissionError:  # If the program cannot write to output text file.
-        outcome.set("Error: The program couldn't access and modify diversity_index.txt.")
-        msg.set("Error: The program couldn't access and modify diversity_index.txt.")
-        message.set("Error: The program couldn't access and modify diversity_index.txt.")
-    except TypeError:  # If program has empty fields passed to it.
-        outcome.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-        msg.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-        message.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-
-
-# Calls all functions/procedures involved in calculating index and writing result to output file for a single location.
-# For options B & C.
-# Parameter is a string that is the location's name.
-# Returns dict with {location name : SDI}. (Used to update index_dict in option B.)
-def create_dict_index(a_string):
-    a_tuple = split_records(a_string)  # Gets location's data from all_records_list (bird count and species name).
-    index_float = calculate_index(a_tuple[0])  # Calculates SDI for location. a_tuple[0] is list of bird counts (int).
-    write_observations(a_tuple[0], a_tuple[1], index_float, a_string)  # Writes location's records and SDI to diversity_index.txt.
-    index_dict[a_string] = index_float  # Stores data (location name and SDI) in a dict for use in option B.
-
-
-# Finds highest SDI (value) and corresponding location name (key) in dictionary, then writes and prints the recommendation.
-# Called for option B.
-def location_recommendation():
+        job_queue.put(("done", function(report_progress)))
+    except Exception as error:  # Shown to user by the GUI thread.
+        job_queue.put(("error", error))
+
+
+# Starts a calculation in a worker thread, so the GUI stays responsive. Only one calculation runs at a time.
+# Parameters: function (calculation, see run_job), function called in the GUI thread with the result,
+# function called in the GUI thread with the exception if the calculation failed.
+def start_job(function, on_done, on_error):
+    global job_thread
+    if job_thread is not None:  # A calculation is already running.
+        outcome.set("Please wait until the current calculation is finished, or cancel it.")
+        message.set("Please wait until the current calculation is finished, or cancel it.")
+        return
+    cancel_event.clear()
+    progress_value.set(0)
+    progress_txt.set("Loading observation records...")
+    cancel_button.config(state=NORMAL)
+    compare_cancel_button.config(state=NORMAL)
+    job_thread = threading.Thread(target=run_job, args=(function,), daemon=True)
+    job_thread.start()
+    root_window.after(POLL_DELAY, poll_job, on_done, on_error)
+
+
+# Checks messages from the worker thread, updates progress and shows the outcome when the calculation ends.
+# Called every POLL_DELAY milliseconds by the Tk event loop while a calculation is running.
+# Parameters: same functions as start_job.
+def poll_job(on_done, on_error):
+    global job_thread
     try:
-        recommended_place = max(index_dict, key=index_dict.get)  # Finds place with highest SDI.
-        records_file = open("../diversity_index.txt", "a")  # Writes recommendation to output text file.
-        records_file.write("\n" + "*" * 70)
-        records_file.write(f"\nGo to {recommended_place} for your walk. SDI = {index_dict[recommended_place]:.2f}.")
-        records_file.close()
-        # Inform user of recommendation in GUI windows.
-        message.set(f"Go to {recommended_place} for your walk. SDI = {index_dict[recommended_place]:.2f}.")
-        outcome.set(f"Go to {recommended_place} for your walk.")
-    except PermissionError:  # If the program cannot write to output text file.
-        message.set("Error: The program couldn't access and modify diversity_index.txt.")
-        outcome.set("Error: The program couldn't access and modify diversity_index.txt.")
-    except ValueError:  # If records could not be read from input file.
-        outcome.set(
-            "Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous.")
-        message.set(
-            "Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous.")
-    
+        while True:
+            kind, value = job_queue.get_nowait()
+            if kind == "progress":
+                done_int, total_int = value
+                progress_value.set(100 * done_int / total_int)
+                progress_txt.set(f"Processed {done_int} of {total_int} locations.")
+            else:
+                job_thread = None
+                cancel_button.config(state=DISABLED)
+                compare_cancel_button.config(state=DISABLED)
+                if kind == "done":
+                    # Shows whether the observation records were read again or taken from memory.
+                    progress_txt.set(f"{progress_txt.get()} {record_store.cache_info()}".strip())
+                    on_done(value)
+                else:
+                    progress_txt.set("")
+                    on_error(value)
+                return
+    except queue.Empty:  # No more messages for now.
+        root_window.after(POLL_DELAY, poll_job, on_done, on_error)
+
+
+# Stops the background calculation after the location being processed.
+# Called when user clicks on "Cancel" button.
+def cancel_job():
+    cancel_event.set()
+
+
+# Returns the message to show for an exception raised by a background calculation.
+# Parameter is an exception.
+def job_error_msg(error):
+    if isinstance(error, CalculationCancelled):  # User clicked "Cancel".
+        return f"Calculation cancelled. {error}"
+    if isinstance(error, OSError) and error.filename == OUTPUT_FILE:  # If output file cannot be created.
+        return OUTPUT_ERROR_MSG
+    if isinstance(error, FileNotFoundError):  # If program could not find input file.
+        return INPUT_ERROR_MSG
+    if isinstance(error, PermissionError):  # If the program cannot open/create output text file.
+        return OUTPUT_ERROR_MSG
+    if isinstance(error, ValueError):  # If input file is empty or erroneous.
+        return RECORDS_ERROR_MSG
+    raise error
+
 
 # Gets back to root window (main menu) from other windows.
 # Called when user clicks on "Back to main menu" button.
@@ -163,9 +152,17 @@ def back_to_main():
     root_window.deiconify()
 
 
+# Shows the current SDI of the records entered in option A, updated after every entry.
+def show_running_index():
+    try:
+        msg.set(f"{len(entered_records)} species entered. Current SDI = {entered_records.index():.2f}.")
+    except ZeroDivisionError:  # Fewer than two birds entered so far.
+        msg.set(f"{len(entered_records)} species entered. Enter at least two birds to get an SDI.")
+
+
 # Gets user's observation records from GUI. Called for option A.
 # Called when user clicks "Save entry" button (records_entry_window).
-# Validates input, stores species name in list of str and bird cound in list of int at same index.
+# Validates input, stores species name and bird count in entered_records (a repeated species adds to its count).
 # Assumes user will not enter negative numbers nor math equations.
 def save_records():
     # Clear output field.
@@ -177,13 +174,16 @@ def save_records():
         # Validate input.
         1 / bird_count_num  # To check that user entered a number different from 0 (ZeroDivisionError).
         if species_str != "":  # Check that species field is not empty.
-            if type(bird_count_num) is int:  # Check that bird count is a whole number (int).
-                # Save records to lists.
-                records_count_list.append(bird_count_num)  # List of int - bird count
-                records_species_list.append(species_str)  # List of str - species name
+            if type(bird_count_num) is int and bird_count_num < 1:  # Check that bird count is not negative.
+                msg.set(f"Invalid input: You entered {bird_count_num} for bird count. "
+                        "Number of observed birds must be 1 or greater.")
+            elif type(bird_count_num) is int:  # Check that bird count is a whole number (int).
+                # Save records and update running totals.
+                entered_records.add(species_str, bird_count_num)
                 # Clear entry fields for next record entry.
                 species_input.delete(0, END)
                 count_input.delete(0, END)
+                show_running_index()
             else:  # Tell user to type in whole number only.
                 msg.set("Invalid input: You did not enter a whole number. Please enter an integer (digits only).")
         else:  # Tell user to enter a species name.
@@ -198,70 +198,129 @@ def save_records():
         msg.set("Invalid input: You entered 0 for bird count. Number of observed birds must be 1 or greater.")
 
 
+# Removes a species and its count from the records entered in option A.
+# Called when user clicks "Remove species" button (records_entry_window).
+def remove_records():
+    species_str = species_name.get()
+    if species_str in entered_records:
+        entered_records.remove(species_str)
+        species_input.delete(0, END)
+        show_running_index()
+    else:  # Tell user the species wasn't entered.
+        msg.set("Invalid input: Enter the name of a species you already saved to remove it.")
+
+
 # Calls all functions/procedures involved in carrying out option A.
 # Called when user clicks "Calculate SDI" button (records_entry_window).
 # Calculates index and writes records & SDI to output file.
 def carry_out_a():
-    global records_species_list
-    global records_count_list
     location_name_str = location_name.get()
     if location_name_str == "":  # Check that user entered location name.
         msg.set("Please enter the name of the location.")
-    elif len(records_species_list) == 1:  # Calculating SDI for one species is useless (SDI = 0).
+    elif len(entered_records) == 1:  # Calculating SDI for one species is useless (SDI = 0).
         msg.set("You entered records for only one species (SDI = 0). Enter at least two species.")
     else:
         try:
-            # Create or clear text file.
-            open("../diversity_index.txt", "w").close()
-            # Calculate SDI, write SDI and records to output file.
-            index_float = calculate_index(records_count_list)
-            write_observations(records_count_list, records_species_list, index_float, location_name_str)
+            # Calculate SDI, create or clear text file and write SDI and records to it.
+            index_float = entered_records.index()
+            count_list, species_list = entered_records.records()
+            with ReportWriter(OUTPUT_FILE) as writer:
+                writer.write_location(count_list, species_list, index_float, location_name_str)
             # Inform user of outcome in GUI.
             outcome.set(f"SDI = {index_float:.2f} at {location_name_str}. Records are in diversity_index.txt.")
             msg.set(f"SDI = {index_float:.2f} at {location_name_str}. Records are in diversity_index.txt.")
             # Clear location name field.
             location_input.delete(0, END)
             # Clear data structures (in case user wants to enter new records).
-            records_species_list = []
-            records_count_list = []
+            entered_records.clear()
         except PermissionError:  # If the program cannot open/create output text file.
-            msg.set("Error: The program couldn't access or create diversity_index.txt.")
-            outcome.set("Error: The program couldn't access or create diversity_index.txt.")
-        except TypeError:  # If program has empty fields passed to it.
-            outcome.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
-            msg.set("Error: The SDI could not be calculated. Check observation records include at least two species and no 0 count.")
+            msg.set(OUTPUT_ERROR_MSG)
+            outcome.set(OUTPUT_ERROR_MSG)
+        except ZeroDivisionError:  # If program has empty fields passed to it.
+            outcome.set(INDEX_ERROR_MSG)
+            msg.set(INDEX_ERROR_MSG)
 
 
 # Calls all functions/procedures involved in carrying out option B.
 # Called when user clicks "Calculate and compare SDI" button (compare_window).
-# Gets user's selection from GUI, calculates and compares indices, gives a recommendation.
+# Gets user's selection from GUI; indices are calculated and compared by a background calculation.
 def carry_out_b():
+    locations = [location1_str.get(), location2_str.get()]
+    message.set("")
+
+    # Runs in the worker thread. Output file is opened once for both locations and the recommendation.
+    def calculation(progress):
+        records = record_store.records()
+        new_index_dict = {}
+        with ReportWriter(OUTPUT_FILE) as writer:
+            failed_list = create_all_indices(records, locations, new_index_dict, writer, progress, cancel_event)
+            if uncertain_recommendation is not None:
+                recommended_place, tie_list = uncertain_recommendation(records, new_index_dict, writer=writer)
+            else:
+                recommended_place = location_recommendation(new_index_dict, writer=writer)
+                tie_list = None
+        return new_index_dict, failed_list, recommended_place, tie_list
+
+    start_job(calculation, show_b_outcome, show_b_error)
+
+
+# Shows the recommendation of option B in GUI windows. Parameter is the tuple returned by the calculation.
+def show_b_outcome(result):
     global index_dict
-    # Clear dictionary.
-    index_dict = {}
-    try:
-        # Create or clear text file.
-        open("../diversity_index.txt", "w").close()
-        # Calculate SDI for first location.
-        first_location = location1_str.get()
-        create_dict_index(first_location)
-        # Calculate SDI for second location.
-        second_location = location2_str.get()
-        create_dict_index(second_location)
-    except ValueError:  # If input file is empty or erroneous.
-        outcome.set("Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous.")
-        message.set("Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous.")
-    except PermissionError:  # If the program cannot open/create output text file.
-        message.set("Error: The program couldn't access or create diversity_index.txt.")
-        outcome.set("Error: The program couldn't access or create diversity_index.txt.")
-    # Compare indices and recommend one location.
-    location_recommendation()
+    index_dict, failed_list, recommended_place, tie_list = result
+    if failed_list:  # Erroneous records could lead to zero division.
+        outcome.set(INDEX_ERROR_MSG)
+        message.set(INDEX_ERROR_MSG)
+    else:
+        recommendation_str = f"Go to {recommended_place} for your walk. SDI = {index_dict[recommended_place]:.2f}."
+        if tie_list:  # Difference between the two SDIs could be due to chance.
+            recommendation_str += (f" But its SDI cannot be told apart ({CONFIDENCE:.0%} confidence) from the SDI of "
+                                   + ", ".join(tie_list) + ".")
+        elif tie_list is not None:
+            recommendation_str += f" Its SDI is higher ({CONFIDENCE:.0%} confidence)."
+        message.set(recommendation_str)
+        outcome.set(f"Go to {recommended_place} for your walk.")
+
+
+# Shows an error of option B in GUI windows. Parameter is an exception.
+def show_b_error(error):
+    message.set(job_error_msg(error))
+    outcome.set(job_error_msg(error))
+
+
+# Starts option C: SDI of each location is calculated and written to text file by a background calculation.
+def carry_out_c():
+    outcome.set("")
+
+    # Runs in the worker thread. Output file is opened once for all locations.
+    def calculation(progress):
+        records = record_store.records()
+        new_index_dict = {}
+        with ReportWriter(OUTPUT_FILE) as writer:
+            failed_list = create_all_indices(records, locations_list, new_index_dict, writer, progress, cancel_event)
+        return new_index_dict, failed_list
+
+    start_job(calculation, show_c_outcome, show_c_error)
+
+
+# Informs user of outcome of option C. Parameter is the tuple returned by the calculation.
+def show_c_outcome(result):
+    global index_dict
+    index_dict, failed_list = result
+    if failed_list:  # Erroneous records could lead to zero division.
+        outcome.set(INDEX_ERROR_MSG)
+    else:
+        outcome.set("Observation records and SDIs are now ready in diversity_index.txt.")
+
+
+# Shows an error of option C in GUI. Parameter is an exception.
+def show_c_error(error):
+    outcome.set(job_error_msg(error))
 
     
 # Executes actions corresponding to user's choice in GUI main menu (root_window).
 # Called when user clicks on one of three options in the listbox menu.
 def menu_choice(event):
-    read_records()
     option_picked = menu.get(menu.curselection())
 
     # Option A.
@@ -282,19 +341,7 @@ def menu_choice(event):
 
     # Option C.
     if option_picked == "Show all existing records and indices":
-        try:
-            # Create or clear text file and output field.
-            outcome.set("")
-            open("../diversity_index.txt", "w").close()
-            # Calculate index and write to text file for each location.
-            for location in locations_list:
-                create_dict_index(location)
-            # Inform user of outcome.
-            outcome.set("Observation records and SDIs are now ready in diversity_index.txt.")
-        except ValueError:  # If input file is empty or erroneous.
-            outcome.set("Error: The SDI couldn't be calculated. Check that observations_records.txt is not empty or erroneous.")
-        except PermissionError:  # If the program cannot open/create output text file.
-            outcome.set("Error: The program couldn't access or create diversity_index.txt.")
+        carry_out_c()
 
 
 
@@ -318,9 +365,19 @@ outcome = StringVar()
 outcome_msg = Entry(root_window, state="readonly", width=90, textvariable=outcome)
 outcome_msg.grid(row=4, column=0, columnspan=2, padx=10, pady=10)
 
+# Progress of background calculation (shared by main menu and compare windows) and Cancel button.
+progress_value = DoubleVar()
+progress_txt = StringVar()
+progress_bar = ttk.Progressbar(root_window, length=400, maximum=100, variable=progress_value)
+progress_bar.grid(row=5, column=0, padx=10, pady=5)
+progress_label = Label(root_window, textvariable=progress_txt, bg="light blue")
+progress_label.grid(row=6, column=0, padx=10)
+cancel_button = Button(root_window, text="Cancel", command=cancel_job, state=DISABLED)
+cancel_button.grid(row=5, column=1, padx=10, pady=5)
+
 # Exit button.
 exit_button = Button(root_window, text="Exit program", command=exit)
-exit_button.grid(row=5, column=0, columnspan=2, pady=10)
+exit_button.grid(row=7, column=0, columnspan=2, pady=10)
 
 
 
@@ -361,6 +418,10 @@ count_input.grid(row=3, column=1, pady=5)
 next_button = Button(records_entry_window, text="Save entry", command=save_records)
 next_button.grid(row=3, column=2, columnspan=2, padx=5, pady=5)
 
+# Remove species button.
+remove_button = Button(records_entry_window, text="Remove species", command=remove_records)
+remove_button.grid(row=2, column=2, columnspan=2, padx=5, pady=5)
+
 # Field to display message informing user of program outcome.
 msg = StringVar()
 done_msg = Entry(records_entry_window, width=90, state="readonly", textvariable=msg)
@@ -414,5 +475,14 @@ compare_button.grid(row=4, column=0, columnspan=2, pady=10)
 back_button = Button(compare_window, text="Back to main menu", command=back_to_main)
 back_button.grid(row=4, column=2, columnspan=2, pady=10)
 
+# Progress of background calculation and Cancel button.
+compare_progress_bar = ttk.Progressbar(compare_window, length=300, maximum=100, variable=progress_value)
+compare_progress_bar.grid(row=5, column=0, columnspan=2, padx=10, pady=5)
+compare_progress_label = Label(compare_window, textvariable=progress_txt, bg="light blue")
+compare_progress_label.grid(row=5, column=2, padx=5)
+compare_cancel_button = Button(compare_window, text="Cancel", command=cancel_job, state=DISABLED)
+compare_cancel_button.grid(row=5, column=3, padx=5, pady=5)
+
 
-root_window.mainloop()
+if __name__ == "__main__":
+    root_window.mainloop()
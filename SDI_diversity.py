@@ -0,0 +1,134 @@
+## Diversity engine: several diversity metrics of a location from one pass over its bird counts.
+## The pass adds up N, sum of n(n-1), sum of n^2, sum of n*ln(n) and the number of species;
+## every metric is then a few operations on these totals, so five metrics cost about one pass.
+## Metrics (METRICS):
+##   simpson          Simpson's 1-D, scaled by MULTIPLICATION_FACTOR (same value as calculate_index)
+##   inverse_simpson  1/D, with D = sum of n(n-1) / N(N-1)
+##   gini_simpson     1 - sum of p^2, with p = n/N
+##   shannon          Shannon H' = -sum of p*ln(p)
+##   evenness         Pielou J = H' / ln(S)
+##   richness         number of species S
+##   total            number of birds N
+## Undefined metrics (fewer than two birds, fewer than two species, ...) are NaN.
+## The batched form (many locations in one NumPy pass) is batch_diversity in SDI_batch.py.
+
+
+## LOADING THE LIBRARIES
+import math
+
+from SDI_calculator import OUTPUT_FILE, index_from_totals, location_recommendation, split_records
+from SDI_report import ReportWriter
+
+
+## DEFINING CONSTANTS
+METRICS = ["simpson", "inverse_simpson", "gini_simpson", "shannon", "evenness", "richness", "total"]
+NAN = float("nan")
+
+
+## DEFINING FUNCTIONS
+# Checks metric names. Parameter is a list of str (None for all metrics).
+# Returns the list of metric names. Raises ValueError for an unknown metric.
+def check_metrics(metrics=None):
+    if metrics is None:
+        return list(METRICS)
+    for metric in metrics:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown diversity metric: {metric}.")
+    return list(metrics)
+
+
+# Adds up one location's bird counts in a single pass.
+# Parameter is a list of int (bird counts).
+# Returns a tuple: N, sum of n(n-1), sum of n^2, sum of n*ln(n), number of species S (counts above 0).
+def diversity_totals(count_list):
+    total_birds_int = 0
+    sum_records_int = 0
+    sum_squares_int = 0
+    sum_log_float = 0.0
+    species_int = 0
+    for bird_count_int in count_list:
+        if bird_count_int > 0:
+            total_birds_int += bird_count_int
+            sum_records_int += (bird_count_int - 1) * bird_count_int
+            sum_squares_int += bird_count_int * bird_count_int
+            sum_log_float += bird_count_int * math.log(bird_count_int)
+            species_int += 1
+    return total_birds_int, sum_records_int, sum_squares_int, sum_log_float, species_int
+
+
+# Calculates metrics from a location's totals (as returned by diversity_totals).
+# Parameters: int (N), int (sum of n(n-1)), int (sum of n^2), float (sum of n*ln(n)), int (S),
+# list of str (metric names, None for all).
+# Returns dict {metric name : value}, NaN where a metric is undefined.
+def metrics_from_totals(total_birds_int, sum_records_int, sum_squares_int, sum_log_float, species_int, metrics=None):
+    result_dict = {}
+    for metric in check_metrics(metrics):
+        if metric == "total":
+            value = total_birds_int
+        elif metric == "richness":
+            value = species_int
+        elif metric == "simpson":
+            value = index_from_totals(sum_records_int, total_birds_int) if total_birds_int > 1 else NAN
+        elif metric == "inverse_simpson":
+            value = total_birds_int * (total_birds_int - 1) / sum_records_int if sum_records_int > 0 else NAN
+        elif metric == "gini_simpson":
+            value = 1 - sum_squares_int / (total_birds_int * total_birds_int) if total_birds_int > 0 else NAN
+        else:
+            # H' = ln(N) - sum of n*ln(n) / N
+            shannon_float = math.log(total_birds_int) - sum_log_float / total_birds_int if total_birds_int > 0 else NAN
+            if metric == "shannon":
+                value = shannon_float
+            else:  # Evenness.
+                value = shannon_float / math.log(species_int) if species_int > 1 else NAN
+        result_dict[metric] = value
+    return result_dict
+
+
+# Calculates diversity metrics of one location in one pass over its bird counts.
+# Parameters: list of int (bird counts), list of str (metric names, None for all).
+# Returns dict {metric name : value}, NaN where a metric is undefined.
+def diversity_indices(count_list, metrics=None):
+    return metrics_from_totals(*diversity_totals(count_list), metrics)
+
+
+# Same as create_dict_index, with all requested metrics calculated in the same pass as the SDI.
+# The SDI (simpson metric) is always calculated; the report shows the other metrics below it.
+# Parameters: RecordsIndex (all records), str (location name), dict (updated with {location name : SDI}),
+# dict (updated with {location name : {metric name : value}}), list of str (metric names, None for all),
+# ReportWriter (or None to skip writing).
+# Returns the location's metrics. Raises ValueError if the location is not in the records,
+# ZeroDivisionError if there are fewer than two birds (as calculate_index).
+def create_diversity_dict(records, a_string, index_dict, diversity_dict, metrics=None, writer=None):
+    count_list, species_list = split_records(records, a_string)
+    metrics = check_metrics(metrics)
+    result_dict = diversity_indices(count_list, metrics if "simpson" in metrics else ["simpson"] + metrics)
+    if result_dict["simpson"] != result_dict["simpson"]:  # NaN: fewer than two birds.
+        raise ZeroDivisionError(f"The SDI of {a_string} could not be calculated.")
+    if writer is not None:
+        writer.write_location(count_list, species_list, result_dict["simpson"], a_string, result_dict)
+    index_dict[a_string] = result_dict["simpson"]
+    diversity_dict[a_string] = result_dict
+    return result_dict
+
+
+# Returns {location name : value} of one metric, to rank or recommend locations by that metric.
+# Parameters: dict {location name : {metric name : value}}, str (metric name).
+def metric_dict(diversity_dict, metric):
+    return {location: result_dict[metric] for location, result_dict in diversity_dict.items()}
+
+
+# Recommends the location with the highest value of a metric (see location_recommendation).
+# Parameters: dict {location name : {metric name : value}}, str (metric name), str (output file, or None),
+# ReportWriter (if given, used instead of the output file).
+# Returns the recommended location's name. Raises ValueError if no location has a value for the metric.
+def metric_recommendation(diversity_dict, metric="simpson", file_name=OUTPUT_FILE, writer=None):
+    values = metric_dict(diversity_dict, metric)
+    if metric == "simpson":  # Same recommendation as for SDI.
+        return location_recommendation(values, file_name, writer)
+    recommended_place = location_recommendation(values, None)
+    if writer is not None:
+        writer.write_recommendation(recommended_place, values[recommended_place], metric)
+    elif file_name is not None:
+        with ReportWriter(file_name, mode="a") as writer:
+            writer.write_recommendation(recommended_place, values[recommended_place], metric)
+    return recommended_place
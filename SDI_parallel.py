@@ -0,0 +1,99 @@
+## Parallel SDI calculation over a large observation file, using several processes.
+## Location blocks (separated by an empty line) are independent, so the memory-mapped input file is
+## split into shards at empty lines and each shard is parsed by a worker process. Workers return only
+## (location name, N, sum of n(n-1)) tuples; the parent merges them in file order and calculates SDIs
+## with the same formula as calculate_index, so results match the serial path exactly.
+
+
+## LOADING THE LIBRARIES
+import locale
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from SDI_calculator import INPUT_FILE, NEWLINE, RecordsIndex, index_from_totals, split_lines
+from SDI_profiling import instrumented
+
+
+## DEFINING CONSTANTS
+SHARDS_PER_WORKER = 4  # More shards than workers evens out the load if location blocks differ in size.
+EMPTY_LINE = re.compile(NEWLINE + NEWLINE)  # End of a location block (LF, CRLF or CR line ends).
+
+
+## DEFINING FUNCTIONS
+# Finds shard boundaries so that every shard starts at the beginning of a location block.
+# Parameters: mmap or bytes (file content), int (number of shards wanted).
+# Returns a list of (start, end) byte offsets covering the whole content, in file order.
+def find_shards(content, shard_count):
+    size_int = len(content)
+    boundaries = [0]
+    for i in range(1, shard_count):
+        position_int = max(size_int * i // shard_count, boundaries[-1])
+        match = EMPTY_LINE.search(content, position_int)
+        if match is None:  # No location block starts after this position.
+            break
+        if match.end() > boundaries[-1]:
+            boundaries.append(match.end())
+    boundaries.append(size_int)
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1) if boundaries[i] < boundaries[i + 1]]
+
+
+# Parses one shard and adds up each location's records. Runs in a worker process.
+# Parameters: str (input file), int (start byte offset), int (end byte offset), str (file encoding).
+# Returns a tuple: list of (location name, N, sum of n(n-1)) in file order, bool (END_MARKER found).
+def shard_totals(file_name, start_int, end_int, encoding):
+    with open(file_name, "rb") as input_file:
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            text = content[start_int:end_int].decode(encoding)
+    records = RecordsIndex().add_lines(split_lines(text))
+    totals = []
+    for location, (location_start, location_end) in records.location_index.items():
+        sum_records_int = 0
+        total_birds_int = 0
+        for bird_count_int in records.count_list[location_start:location_end]:
+            sum_records_int += (bird_count_int - 1) * bird_count_int
+            total_birds_int += bird_count_int
+        totals.append((location, total_birds_int, sum_records_int))
+    return totals, records.end_found
+
+
+# Adds up each location's records using several processes.
+# Parameters: str (input file), int (number of worker processes, None for one per CPU).
+# Returns dict {location name : (N, sum of n(n-1))}, in file order.
+# As in read_records, only the first records of a duplicate location are kept and lines after END_MARKER are ignored.
+# Raises FileNotFoundError if the input file doesn't exist.
+@instrumented("parallel_totals", lambda args, kwargs, result: (0, len(result)))
+def parallel_totals(file_name=INPUT_FILE, workers=None):
+    workers = workers or os.cpu_count() or 1
+    with open(file_name, "rb") as input_file:
+        if os.fstat(input_file.fileno()).st_size == 0:  # An empty file cannot be memory-mapped.
+            return {}
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            shards = find_shards(content, workers * SHARDS_PER_WORKER)
+    encoding = locale.getpreferredencoding(False)  # Same encoding as open() in read_records.
+    totals_dict = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(shard_totals, [file_name] * len(shards), [start for start, end in shards],
+                               [end for start, end in shards], [encoding] * len(shards))
+        for totals, end_found in results:  # Shards in file order.
+            for location, total_birds_int, sum_records_int in totals:
+                if location not in totals_dict:
+                    totals_dict[location] = (total_birds_int, sum_records_int)
+            if end_found:  # Following shards are after END_MARKER.
+                break
+    return totals_dict
+
+
+# Calculates SDI of every location using several processes.
+# Parameters: str (input file), int (number of worker processes, None for one per CPU).
+# Returns dict {location name : SDI}, in file order, with NaN for locations with fewer than two birds.
+# Raises FileNotFoundError if the input file doesn't exist.
+def parallel_index(file_name=INPUT_FILE, workers=None):
+    index_dict = {}
+    for location, (total_birds_int, sum_records_int) in parallel_totals(file_name, workers).items():
+        try:
+            index_dict[location] = index_from_totals(sum_records_int, total_birds_int)
+        except ZeroDivisionError:  # Fewer than two birds.
+            index_dict[location] = float("nan")
+    return index_dict
@@ -0,0 +1,112 @@
+## Instrumentation of the SDI pipeline: wall time, calls, bytes and records of each stage.
+## Pipeline functions are registered with instrumented(stage), which leaves them unchanged while no hook is
+## registered, so instrumentation costs nothing when it is disabled. When the first hook is added, every name
+## bound to a registered function (module globals, including names imported from other modules, and class
+## attributes) is bound to a timed wrapper instead; when the last hook is removed, to the function again.
+## References kept elsewhere (e.g. in a list) are not swapped.
+## Hooks are objects with a record(stage, seconds, bytes, records) method, added with add_hook.
+## StageStats is a hook that adds up measurements per stage and prints a summary (--profile in the CLI).
+## Stages are nested (create_dict_index calls split_records and calculate_index), so times are inclusive.
+## Worker processes of SDI_parallel.py are not instrumented.
+
+
+## LOADING THE LIBRARIES
+import functools
+import sys
+import time
+
+
+## DEFINING DATA STRUCTURES
+hooks = []  # Registered hooks, called after each instrumented call.
+wrappers = {}  # {id of instrumented function : (function, timed wrapper)}
+functions = {}  # {id of timed wrapper : (wrapper, instrumented function)}
+
+
+## DEFINING FUNCTIONS
+# Registers a hook. Parameter is an object with a record(stage, seconds, bytes, records) method.
+def add_hook(hook):
+    hooks.append(hook)
+    if len(hooks) == 1:
+        swap_functions(wrapped=True)
+    return hook
+
+
+# Unregisters a hook. Parameter is a hook added with add_hook.
+def remove_hook(hook):
+    hooks.remove(hook)
+    if not hooks:
+        swap_functions(wrapped=False)
+
+
+# Binds every name of a loaded module or of its classes that refers to an instrumented function to its
+# timed wrapper, or every name that refers to a wrapper to its function.
+# Parameter is a bool (True to bind the wrappers, False to bind the functions).
+def swap_functions(wrapped):
+    swap_dict = wrappers if wrapped else functions
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for name, value in list(namespace.items()):
+            if isinstance(value, type) and value.__module__ == namespace.get("__name__"):
+                for attribute, attribute_value in list(vars(value).items()):  # Methods of classes.
+                    if swapped(swap_dict, attribute_value) is not None:
+                        setattr(value, attribute, swapped(swap_dict, attribute_value))
+            elif swapped(swap_dict, value) is not None:
+                namespace[name] = swapped(swap_dict, value)
+
+
+# Returns the object to bind instead of value. Parameters: dict (wrappers or functions), any object.
+# Returns None if value is not in the dict.
+def swapped(swap_dict, value):
+    pair = swap_dict.get(id(value))
+    return pair[1] if pair is not None and pair[0] is value else None
+
+
+# Returns a decorator that registers a function to be measured while hooks are registered (see add_hook).
+# The decorator returns the function itself, or its timed wrapper if a hook is already registered.
+# Parameters: str (stage name), function called with (args, kwargs, result) that returns the
+# (bytes read or written, records processed) of the call (None if the stage has neither).
+def instrumented(stage, measure=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not hooks:  # Reference taken while instrumentation was enabled.
+                return function(*args, **kwargs)
+            start_float = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds_float = time.perf_counter() - start_float
+            bytes_int, records_int = measure(args, kwargs, result) if measure is not None else (0, 0)
+            for hook in list(hooks):
+                hook.record(stage, seconds_float, bytes_int, records_int)
+            return result
+        wrappers[id(function)] = (function, wrapper)
+        functions[id(wrapper)] = (wrapper, function)
+        return wrapper if hooks else function
+    return decorator
+
+
+# Hook adding up measurements per stage: calls, total wall time, bytes and records.
+class StageStats:
+    def __init__(self):
+        self.stages = {}  # {stage name : [calls, seconds, bytes, records]}
+
+    def record(self, stage, seconds_float, bytes_int, records_int):
+        totals = self.stages.setdefault(stage, [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += seconds_float
+        totals[2] += bytes_int
+        totals[3] += records_int
+
+    # Returns the measurements as a dict {stage name : {"calls", "seconds", "bytes", "records"}}.
+    def as_dict(self):
+        return {stage: {"calls": calls, "seconds": seconds, "bytes": bytes_int, "records": records_int}
+                for stage, (calls, seconds, bytes_int, records_int) in self.stages.items()}
+
+    # Returns the measurements as a table (str), slowest stage first.
+    def summary(self):
+        lines = [f"{'Stage':<26}{'Calls':>10}{'Total (s)':>12}{'Mean (ms)':>12}{'Records':>12}{'MB':>10}"]
+        for stage, (calls, seconds, bytes_int, records_int) in sorted(self.stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{stage:<26}{calls:>10}{seconds:>12.4f}{1000 * seconds / calls:>12.4f}"
+                         f"{records_int:>12}{bytes_int / 1e6:>10.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,76 @@
+## Ranking of locations by SDI: best (or worst) k locations among all computed indices.
+## Works on indices that were already calculated ({location name : SDI}, as returned by the batch,
+## parallel or serial paths), so queries never recalculate an SDI. Selection uses a heap
+## (O(n log k)) instead of sorting every location. Locations whose SDI is NaN are never ranked.
+## Queries can be restricted to names starting with a prefix (found by binary search in the
+## sorted names) or to a set of names.
+
+
+## LOADING THE LIBRARIES
+import heapq
+from bisect import bisect_left
+from operator import itemgetter
+
+
+## DEFINING FUNCTIONS
+# Returns the k locations with the highest (or lowest) SDI, best first (or worst first).
+# Parameters: dict {location name : SDI} or iterable of (location name, SDI), int (k),
+# bool (True for highest SDI, False for lowest).
+# Returns a list of (location name, SDI). Ties keep the order of the input.
+def top_locations(index_items, k=1, best=True):
+    if isinstance(index_items, dict):
+        index_items = index_items.items()
+    index_items = ((location, index_float) for location, index_float in index_items if index_float == index_float)
+    if best:
+        return heapq.nlargest(k, index_items, key=itemgetter(1))
+    return heapq.nsmallest(k, index_items, key=itemgetter(1))
+
+
+# Ranks locations by SDI, for many queries over the same indices.
+# Parameter is a dict {location name : SDI}. The dict is used as is (not copied): locations added to it
+# later are ranked too; call refresh() after adding locations if prefix queries are used.
+class RankingEngine:
+    def __init__(self, index_dict):
+        self.index_dict = index_dict
+        self._sorted_names = None  # Location names in alphabetical order, for prefix queries.
+
+    # Forgets the sorted names, so that prefix queries see locations added since the last query.
+    def refresh(self):
+        self._sorted_names = None
+
+    # Returns the names of locations starting with a prefix, using binary search in the sorted names.
+    # Parameter is a str (prefix).
+    def _prefix_names(self, prefix):
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.index_dict)
+        start_int = bisect_left(self._sorted_names, prefix)
+        end_int = start_int
+        while end_int < len(self._sorted_names) and self._sorted_names[end_int].startswith(prefix):
+            end_int += 1
+        return self._sorted_names[start_int:end_int]
+
+    # Returns the (location name, SDI) pairs matching a filter.
+    # Parameters: str (location name prefix, None for no filter), iterable of str (location names, None for no filter).
+    def _candidates(self, prefix=None, names=None):
+        if prefix is not None:
+            candidates = self._prefix_names(prefix)
+            if names is not None:
+                names = set(names)
+                candidates = [location for location in candidates if location in names]
+        elif names is not None:
+            candidates = [location for location in dict.fromkeys(names) if location in self.index_dict]
+        else:
+            return self.index_dict.items()
+        return ((location, self.index_dict[location]) for location in candidates)
+
+    # Returns the k locations with the highest SDI, best first.
+    # Parameters: int (k), str (location name prefix, None for all), iterable of str (location names, None for all).
+    # Returns a list of (location name, SDI).
+    def top(self, k=10, prefix=None, names=None):
+        return top_locations(self._candidates(prefix, names), k, best=True)
+
+    # Returns the k locations with the lowest SDI, worst first.
+    # Parameters: int (k), str (location name prefix, None for all), iterable of str (location names, None for all).
+    # Returns a list of (location name, SDI).
+    def bottom(self, k=10, prefix=None, names=None):
+        return top_locations(self._candidates(prefix, names), k, best=False)
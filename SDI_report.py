@@ -0,0 +1,251 @@
+## Report writer of the SDI calculator: writes observation records, indices and recommendations.
+## The output file is opened once per run; rows are kept in a buffer and written in bulk.
+## Output formats are pluggable (REPORT_FORMATS): fixed-width table (as in diversity_index.txt),
+## CSV and JSON Lines. With atomic=True the report is written to a temporary file that replaces
+## the output file only when the report is complete.
+
+
+## LOADING THE LIBRARIES
+import csv
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+
+from SDI_profiling import instrumented
+
+
+## DEFINING CONSTANTS
+BUFFER_ROWS = 4096  # Number of buffered rows that triggers a write to the output file.
+
+
+## DEFINING OUTPUT FORMATS
+# Each format turns a location's records and SDI, or a recommendation, into one str (possibly several lines).
+# header() is written once, at the start of a new (truncated) file.
+# A location can also have other diversity metrics ({metric name : value}, see SDI_diversity.py),
+# and a recommendation can be based on a metric other than the SDI.
+
+# Fixed-width table, same layout as diversity_index.txt.
+class TableFormat:
+    def header(self):
+        return ""
+
+    # Parameters: list of int (bird count), list of str (species), float (SDI), str (location name),
+    # dict {metric name : value} (other metrics, or None).
+    def location(self, count_list, species_list, a_float, a_str, metrics=None):
+        rows = ["\n\n" + "*" * 70, f"\nObservation records for {a_str}.", "\n" + "*" * 70]  # Title of table.
+        for i in range(0, len(species_list)):  # Table style. Matching species and count are at same index in each list.
+            rows.append(f"\n{species_list[i]}".ljust(40))
+            rows.append(f"{count_list[i]}".ljust(20))
+        rows.append(f"\n\nIn {a_str}, SDI = {a_float:.2f}.")  # SDI below the table.
+        other_metrics = [f"{metric} = {format_metric(value)}" for metric, value in (metrics or {}).items()
+                         if metric != "simpson"]
+        if other_metrics:  # Other metrics below the SDI.
+            rows.append("\nOther indices: " + ", ".join(other_metrics) + ".")
+        return "".join(rows)
+
+    # Parameters: str (recommended location name), float (its SDI, or value of the metric),
+    # str (metric used for the recommendation, None for SDI).
+    def recommendation(self, a_str, a_float, metric=None):
+        return "\n" + "*" * 70 + f"\nGo to {a_str} for your walk. {metric or 'SDI'} = {a_float:.2f}."
+
+    # Parameters: str (recommended location name), list of str (locations it cannot be told apart from),
+    # float (confidence level).
+    def indistinguishable(self, a_str, location_list, a_float):
+        if not location_list:
+            return f"\nIts SDI is higher than at every other location ({a_float:.0%} confidence)."
+        return (f"\nIts SDI cannot be told apart ({a_float:.0%} confidence) from the SDI of: "
+                + ", ".join(location_list) + ".")
+
+
+# Comma-separated values, one row per species, one row per SDI, one row per other metric and one row
+# per recommendation.
+# Columns: record (observation, index, metric, recommendation or indistinguishable), location, species, count, sdi.
+# Metric rows have the metric's name in the species column and its value in the sdi column, and so do
+# recommendations based on a metric other than the SDI.
+# Indistinguishable rows have the recommended location, one location it cannot be told apart from in the
+# species column, and the confidence level in the sdi column.
+class CsvFormat:
+    def _rows(self, rows):
+        text = io.StringIO()
+        csv.writer(text, lineterminator="\n").writerows(rows)
+        return text.getvalue()
+
+    def header(self):
+        return self._rows([["record", "location", "species", "count", "sdi"]])
+
+    def location(self, count_list, species_list, a_float, a_str, metrics=None):
+        rows = [["observation", a_str, species, count, ""] for species, count in zip(species_list, count_list)]
+        rows.append(["index", a_str, "", sum(count_list), f"{a_float:.6f}"])
+        for metric, value in (metrics or {}).items():
+            if metric != "simpson":
+                rows.append(["metric", a_str, metric, "", format_metric(value, 6)])
+        return self._rows(rows)
+
+    def recommendation(self, a_str, a_float, metric=None):
+        return self._rows([["recommendation", a_str, metric or "", "", f"{a_float:.6f}"]])
+
+    def indistinguishable(self, a_str, location_list, a_float):
+        return self._rows([["indistinguishable", a_str, location, "", f"{a_float:.6f}"] for location in location_list])
+
+
+# JSON Lines, one object per location and one per recommendation. NaN values are written as null.
+class JsonLinesFormat:
+    def header(self):
+        return ""
+
+    def location(self, count_list, species_list, a_float, a_str, metrics=None):
+        records = [{"species": species, "count": count} for species, count in zip(species_list, count_list)]
+        line = {"location": a_str, "records": records, "total": sum(count_list), "sdi": json_float(a_float)}
+        if metrics:
+            line["metrics"] = {metric: json_float(value) for metric, value in metrics.items() if metric != "simpson"}
+        return json.dumps(line) + "\n"
+
+    def recommendation(self, a_str, a_float, metric=None):
+        line = {"recommendation": a_str, "sdi": json_float(a_float)}
+        if metric is not None:
+            line = {"recommendation": a_str, "metric": metric, "value": json_float(a_float)}
+        return json.dumps(line) + "\n"
+
+    def indistinguishable(self, a_str, location_list, a_float):
+        return json.dumps({"recommendation": a_str, "indistinguishable": location_list, "confidence": a_float}) + "\n"
+
+
+# Returns a metric's value as a str: int as is, float with a number of decimals.
+# Parameters: int or float (value), int (number of decimals).
+def format_metric(value, decimals_int=4):
+    if isinstance(value, int):
+        return str(value)
+    return f"{value:.{decimals_int}f}"
+
+
+# Returns a float that can be written to JSON (None instead of NaN).
+def json_float(a_float):
+    if a_float is None or math.isnan(a_float):
+        return None
+    return a_float
+
+
+REPORT_FORMATS = {"table": TableFormat, "csv": CsvFormat, "jsonl": JsonLinesFormat}
+
+
+## DEFINING THE WRITER
+# Writes a report to one output file, opened once.
+# Parameters: str (output file), str (format name in REPORT_FORMATS, or a format object),
+# str ("w" to create or clear the file, "a" to append), bool (atomic: write to a temporary file,
+# then rename it to the output file when the writer is closed without error).
+# Use as a context manager: with ReportWriter(file_name) as writer: ...
+# Raises OSError (PermissionError, FileNotFoundError for a missing directory...) if the output file cannot
+# be created, ValueError for an unknown format
+# or for an atomic report in append mode.
+class ReportWriter:
+    def __init__(self, file_name, report_format="table", mode="w", atomic=False, buffer_rows=BUFFER_ROWS):
+        if isinstance(report_format, str):
+            if report_format not in REPORT_FORMATS:
+                raise ValueError(f"Unknown report format: {report_format}.")
+            report_format = REPORT_FORMATS[report_format]()
+        if mode not in ("w", "a"):
+            raise ValueError(f"Unknown mode: {mode}.")
+        if atomic and mode == "a":
+            raise ValueError("An atomic report cannot be appended to an existing file.")
+        self.file_name = file_name
+        self.report_format = report_format
+        self.atomic = atomic
+        self.buffer_rows = buffer_rows
+        self._buffer = []
+        self._temp_name = None
+        if atomic:
+            directory = os.path.dirname(os.path.abspath(file_name))
+            file_descriptor, self._temp_name = tempfile.mkstemp(dir=directory, prefix=".sdi_report_")
+            self._file = os.fdopen(file_descriptor, "w")
+        else:
+            self._file = open(file_name, mode)
+        if mode == "w" or self._file.tell() == 0:
+            self._add(self.report_format.header())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    # Adds a str to the buffer, writes the buffer if it is full.
+    def _add(self, a_str):
+        if a_str:
+            self._buffer.append(a_str)
+            if len(self._buffer) >= self.buffer_rows:
+                self.flush()
+
+    # Writes a location's records and SDI.
+    # Parameters: list of int (bird count), list of str (species), float (SDI), str (location name),
+    # dict {metric name : value} (other diversity metrics, or None).
+    def write_location(self, count_list, species_list, a_float, a_str, metrics=None):
+        if metrics:
+            self._add(self.report_format.location(count_list, species_list, a_float, a_str, metrics))
+        else:
+            self._add(self.report_format.location(count_list, species_list, a_float, a_str))
+
+    # Writes a recommendation.
+    # Parameters: str (recommended location name), float (its SDI, or value of the metric),
+    # str (metric used for the recommendation, None for SDI).
+    def write_recommendation(self, a_str, a_float, metric=None):
+        if metric is not None:
+            self._add(self.report_format.recommendation(a_str, a_float, metric))
+        else:
+            self._add(self.report_format.recommendation(a_str, a_float))
+
+    # Writes the locations that cannot be told apart from the recommended location.
+    # Parameters: str (recommended location name), list of str (indistinguishable locations, None if there was
+    # no other location to compare with: nothing is written), float (confidence level).
+    def write_indistinguishable(self, a_str, location_list, a_float):
+        if location_list is not None:
+            self._add(self.report_format.indistinguishable(a_str, location_list, a_float))
+
+    # Writes rows already formatted by this writer's format (for example kept from an earlier report).
+    # Parameter is a str.
+    def write_text(self, a_str):
+        self._add(a_str)
+
+    # Writes buffered rows to the output file.
+    # Returns the number of bytes written (in the output file's encoding).
+    @instrumented("report_flush", lambda args, kwargs, result: (result, 0))
+    def flush(self):
+        if not self._buffer:
+            return 0
+        text = "".join(self._buffer)
+        self._file.write(text)
+        self._buffer = []
+        if text.isascii():  # One byte per character in every encoding used for reports.
+            return len(text)
+        return len(text.encode(self._file.encoding, self._file.errors))
+
+    # Writes remaining rows and closes the output file (renames the temporary file if atomic).
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        if self._temp_name is not None:
+            # Temporary files are private (0600): give the report the output file's permissions.
+            if os.path.exists(self.file_name):
+                shutil.copymode(self.file_name, self._temp_name)
+            else:
+                os.chmod(self._temp_name, 0o644)
+            os.replace(self._temp_name, self.file_name)
+            self._temp_name = None
+
+    # Closes the output file after an error. If atomic, the temporary file is deleted and the output
+    # file is left unchanged; otherwise rows written so far are kept.
+    def abort(self):
+        if self._temp_name is None:
+            self.close()
+            return
+        self._buffer = []
+        self._file.close()
+        os.remove(self._temp_name)
+        self._temp_name = None
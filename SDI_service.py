@@ -0,0 +1,270 @@
+## Local query service: SDIs of an observation file over HTTP, answered in JSON (standard library only).
+## Endpoints (GET):
+##   /locations                          all locations in file order, with their SDI
+##   /locations/<name>                   one location (name URL-encoded)
+##   /compare?location=<name>&location=<name>...   several locations, best first, and the recommended one
+##   /stats                              cache statistics
+## Per-location results are kept in a bounded LRU cache. The observation file is read again only when it
+## changed (RecordStore); the cache is emptied then. Concurrent requests for a location that is not cached
+## yet are coalesced: the first request calculates it, the others wait for its result.
+## Usage: python SDI_service.py [input file] [--host host] [--port port] [--cache-size size]
+
+
+## LOADING THE LIBRARIES
+import argparse
+import json
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from SDI_calculator import INDEX_ERROR_MSG, INPUT_ERROR_MSG, INPUT_FILE, RECORDS_ERROR_MSG, RecordStore, calculate_index
+from SDI_ranking import top_locations
+from SDI_report import json_float
+
+
+## DEFINING CONSTANTS
+HOST = "127.0.0.1"  # Local connections only.
+PORT = 8000
+CACHE_SIZE = 1024  # Largest number of location results kept in memory.
+
+
+## DEFINING CLASSES
+# A result being calculated by one request, waited for by the others.
+class PendingResult:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Bounded LRU cache of per-location results, with coalescing of concurrent calculations.
+# Parameter is an int (largest number of results kept).
+class ResultCache:
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Requests that waited for another request's calculation.
+        self._results = OrderedDict()  # {location name : result}, least recently used first.
+        self._pending = {}  # {location name : PendingResult} of calculations in progress.
+        self._generation = 0  # Incremented by clear(): results of older calculations are not cached.
+        self._lock = threading.Lock()
+
+    # Returns the result of a location, calculated with function(location) if it is not cached.
+    # Parameters: str (location name), function returning the result (may raise an exception,
+    # which is raised to every request waiting for it; failed calculations are not cached),
+    # int (generation the function's records belong to, as returned by clear()).
+    # A function of an older generation is called without caching its result or sharing it with other requests.
+    def get(self, a_string, function, generation_int):
+        with self._lock:
+            if a_string in self._results:
+                self._results.move_to_end(a_string)
+                self.hits += 1
+                return self._results[a_string]
+            stale = generation_int != self._generation
+            pending = None if stale else self._pending.get(a_string)
+            if pending is None:
+                pending = PendingResult()
+                if not stale:
+                    self._pending[a_string] = pending
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.coalesced += 1
+        if stale:  # Records were read before the file changed.
+            return function(a_string)
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        try:
+            pending.result = function(a_string)
+        except Exception as error:
+            pending.error = error
+            raise
+        finally:
+            with self._lock:
+                if self._pending.get(a_string) is pending:
+                    del self._pending[a_string]
+                if pending.error is None and generation_int == self._generation:
+                    self._results[a_string] = pending.result
+                    if len(self._results) > self.max_size:
+                        self._results.popitem(last=False)
+            pending.done.set()
+        return pending.result
+
+    # Forgets all results, and makes calculations in progress not cached when they finish.
+    # Returns the new generation (int), to pass to get() with results of the new records.
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+            self._pending.clear()
+            self._generation += 1
+            return self._generation
+
+    # Returns cache statistics as a dict.
+    def cache_info(self):
+        with self._lock:
+            return {"size": len(self._results), "max_size": self.max_size, "hits": self.hits,
+                    "misses": self.misses, "coalesced": self.coalesced}
+
+
+# SDI queries on one observation file, shared by the request handlers.
+# Parameters: str (input file), int (largest number of location results cached).
+class SDIService:
+    def __init__(self, file_name=INPUT_FILE, cache_size=CACHE_SIZE):
+        self.record_store = RecordStore(file_name)
+        self.result_cache = ResultCache(cache_size)
+        self._records = None  # RecordsIndex the cached results were calculated from.
+        self._generation = None  # Cache generation of these records.
+        self._listing = (None, None)  # (generation, results of all locations) of the last listing.
+        self._lock = threading.Lock()  # RecordStore is not thread-safe.
+        self._listing_lock = threading.Lock()  # One listing is calculated at a time.
+
+    # Returns the current records and their cache generation, and empties the result cache if the input
+    # file changed.
+    # Raises FileNotFoundError if the input file doesn't exist.
+    def records(self):
+        with self._lock:
+            records = self.record_store.records()
+            if records is not self._records:
+                self._generation = self.result_cache.clear()
+                self._records = records
+            return records, self._generation
+
+    # Calculates the result of one location.
+    # Parameters: RecordsIndex, str (location name).
+    # Returns a dict (location, sdi: null if it cannot be calculated, total, species).
+    # Raises ValueError if the location is not in the records.
+    def _calculate(self, records, a_string):
+        count_list, species_list = records.get(a_string)
+        result = {"location": a_string, "sdi": None, "total": sum(count_list), "species": len(species_list)}
+        try:
+            result["sdi"] = json_float(calculate_index(count_list))
+        except ZeroDivisionError:  # Erroneous records (fewer than two birds).
+            result["error"] = INDEX_ERROR_MSG
+        return result
+
+    # Returns the result of one location (see _calculate), from the cache if possible.
+    # Raises ValueError if the location is not in the records, FileNotFoundError if the input file doesn't exist.
+    def location(self, a_string):
+        records, generation_int = self.records()
+        return self.result_cache.get(a_string, lambda location: self._calculate(records, location), generation_int)
+
+    # Returns the results of all locations, in file order.
+    # The listing is calculated in one pass and kept until the file changes; it doesn't use the LRU cache,
+    # so a listing never evicts the results of single locations.
+    # Raises FileNotFoundError if the input file doesn't exist.
+    def all_locations(self):
+        records, generation_int = self.records()  # The file is checked once for the whole listing.
+        with self._listing_lock:  # Concurrent listings wait for the first one.
+            if self._listing[0] != generation_int:
+                self._listing = (generation_int, [self._calculate(records, location)
+                                                  for location in records.locations()])
+            return self._listing[1]
+
+    # Compares several locations.
+    # Parameter is a list of str (location names).
+    # Returns a dict: results (best SDI first, locations without SDI last), recommended location (None if
+    # no SDI) and names that are not in the records.
+    def compare(self, locations):
+        results = []
+        missing_list = []
+        for location in dict.fromkeys(locations):
+            try:
+                results.append(self.location(location))
+            except ValueError:  # Location is not in the input file.
+                missing_list.append(location)
+        index_items = [(result["location"], result["sdi"]) for result in results if result["sdi"] is not None]
+        ranking_list = top_locations(index_items, len(index_items))
+        order_dict = {location: i for i, (location, index_float) in enumerate(ranking_list)}
+        results.sort(key=lambda result: order_dict.get(result["location"], len(order_dict)))
+        return {"results": results, "recommendation": ranking_list[0][0] if ranking_list else None,
+                "missing": missing_list}
+
+    # Returns cache statistics as a dict.
+    def stats(self):
+        return {"results": self.result_cache.cache_info(),
+                "records": {"hits": self.record_store.hits, "misses": self.record_store.misses}}
+
+
+# Answers HTTP requests with the SDIService of the server (server.service).
+class SDIRequestHandler(BaseHTTPRequestHandler):
+    # Sends a JSON response. Parameters: int (HTTP status), JSON-serialisable object.
+    def _send_json(self, status_int, content):
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status_int)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        try:
+            if path == "/locations":
+                self._send_json(200, service.all_locations())
+            elif path.startswith("/locations/"):
+                self._send_json(200, service.location(unquote(path[len("/locations/"):])))
+            elif path == "/compare":
+                locations = parse_qs(url.query).get("location", [])
+                if not locations:
+                    self._send_json(400, {"error": "Give the locations to compare: /compare?location=...&location=..."})
+                else:
+                    self._send_json(200, service.compare(locations))
+            elif path == "/stats":
+                self._send_json(200, service.stats())
+            else:
+                self._send_json(404, {"error": f"Unknown path: {url.path}"})
+        except ValueError:  # Location is not in the input file.
+            self._send_json(404, {"error": RECORDS_ERROR_MSG})
+        except (FileNotFoundError, PermissionError):  # Input file cannot be read.
+            self._send_json(503, {"error": INPUT_ERROR_MSG})
+
+    # Requests are not logged to stderr, which would slow down the service under load.
+    def log_message(self, format, *args):
+        pass
+
+
+## DEFINING FUNCTIONS
+# Creates the HTTP server (not started).
+# Parameters: SDIService, str (host), int (port, 0 for any free port).
+# Returns a ThreadingHTTPServer, one thread per request; its address is server.server_address.
+def make_server(service, host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), SDIRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# Runs the service from the command line. Parameter is a list of str (None to use sys.argv).
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the SDIs of an observation file as JSON over HTTP.")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="observation records (default: %(default)s)")
+    parser.add_argument("--host", default=HOST, help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        help="largest number of location results kept in memory (default: %(default)s)")
+    arguments = parser.parse_args(argv)
+    if arguments.cache_size < 1:
+        parser.error("--cache-size must be at least 1")
+    server = make_server(SDIService(arguments.input_file, arguments.cache_size), arguments.host, arguments.port)
+    host, port = server.server_address[:2]
+    print(f"Serving SDIs of {arguments.input_file} on http://{host}:{port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:  # User stopped the service.
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
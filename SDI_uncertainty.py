@@ -0,0 +1,195 @@
+## Uncertainty of SDIs: bootstrap confidence intervals and rarefied SDIs (requires NumPy).
+## A bootstrap resample draws N birds (multinomial draw) with the observed species proportions. Drawing with
+## replacement lowers the SDI of resamples on average (by a factor of about (N-1)/N on the Simpson sum), so
+## resampled SDIs are shifted to the observed SDI before intervals are taken.
+## A rarefied resample draws the same number of birds (sample_size) at every location without replacement
+## (one hypergeometric draw per species), so that locations observed with different effort can be compared.
+## The SDI is an unbiased estimate, so a rarefied SDI has the same expected value as the SDI; its interval
+## is what shows how precise the SDI is at the common sample size.
+## Draws for many locations and resamples are made in one NumPy call over a matrix of count vectors
+## (padded with zero counts), in chunks that keep memory bounded, with a seeded random generator so
+## that results can be repeated.
+## Two locations are statistically indistinguishable when the confidence interval of the difference
+## between their bootstrap SDIs includes 0. uncertain_recommendation recommends the location with the
+## highest SDI, as location_recommendation does, and lists the locations it cannot be told apart from.
+
+## LOADING THE LIBRARIES
+import numpy as np
+
+from SDI_calculator import MULTIPLICATION_FACTOR, OUTPUT_FILE, location_recommendation, split_records
+from SDI_profiling import instrumented
+from SDI_report import ReportWriter
+
+
+## DEFINING CONSTANTS
+RESAMPLES = 1000  # Number of resamples per location.
+CONFIDENCE = 0.95  # Confidence level of the intervals.
+SEED = 0  # Seed of the random generator.
+CHUNK_SIZE = 2 ** 22  # Largest number of counts drawn at once (resamples x locations x species).
+
+
+## DEFINING FUNCTIONS
+# Puts the bird counts of several locations in one matrix, one row per location, padded with zero counts.
+# Parameter is a list of lists of int (bird counts of each location).
+# Returns a tuple: int64 array (locations x most species), int64 array (N of each location).
+def pad_counts(count_lists):
+    species_int = max((len(count_list) for count_list in count_lists), default=0)
+    count_array = np.zeros((len(count_lists), max(species_int, 1)), dtype=np.int64)
+    for i, count_list in enumerate(count_lists):
+        count_array[i, :len(count_list)] = count_list
+    return count_array, count_array.sum(axis=1)
+
+
+# Calculates SDIs from sums of n(n-1) and numbers of birds drawn, NaN where fewer than two birds were drawn.
+# Parameters: int64 array (sum of n(n-1) of each resample), int64 array (birds drawn, broadcast to the first).
+def resampled_index(pairs_array, draw_array):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index_array = (1 - pairs_array / (draw_array * (draw_array - 1))) * MULTIPLICATION_FACTOR
+    return np.where(draw_array > 1, index_array, np.nan)
+
+
+# Calculates the SDIs of resamples of each location.
+# Parameters: list of lists of int (bird counts of each location), int (number of resamples),
+# int (birds drawn per resample without replacement, None for bootstrap resamples of each location's own N),
+# int (seed).
+# Returns an array of float (resamples x locations), NaN for locations with fewer than two birds,
+# and for rarefaction if sample_size is below 2 or above a location's N.
+@instrumented("resample_indices", lambda args, kwargs, result: (0, result.size))
+def resample_indices(count_lists, resamples=RESAMPLES, sample_size=None, seed=SEED):
+    rng = np.random.default_rng(seed)
+    index_array = np.full((resamples, len(count_lists)), np.nan)
+    if not count_lists:
+        return index_array
+    count_array, total_array = pad_counts(count_lists)
+    if sample_size is None:
+        valid = total_array > 1
+        draw_array = np.where(valid, total_array, 0)  # Locations with fewer than two birds draw nothing.
+    else:
+        valid = (total_array >= sample_size) & (sample_size > 1)
+        draw_array = np.where(valid, sample_size, 0)
+    pvals_array = np.zeros(count_array.shape)
+    pvals_array[valid] = count_array[valid] / total_array[valid, None]
+    pvals_array[~valid, 0] = 1.0
+    chunk_int = max(1, CHUNK_SIZE // max(1, resamples * count_array.shape[1]))  # Locations per chunk.
+    for start_int in range(0, len(count_lists), chunk_int):
+        end_int = min(start_int + chunk_int, len(count_lists))
+        draws = draw_array[start_int:end_int]
+        if sample_size is None:
+            # One multinomial draw per (resample, location): resamples x chunk locations x species.
+            sample_array = rng.multinomial(draws, pvals_array[start_int:end_int], size=(resamples, end_int - start_int))
+            pairs_array = (sample_array * (sample_array - 1)).sum(axis=2)
+        else:
+            # One hypergeometric draw per species, for all resamples and locations of the chunk at once:
+            # birds of this species drawn among the birds left to draw, from the birds of the following species.
+            shape = (resamples, end_int - start_int)
+            left_array = np.broadcast_to(draws, shape).copy()
+            other_array = total_array[start_int:end_int].copy()
+            pairs_array = np.zeros(shape, dtype=np.int64)
+            for species_count_array in count_array[start_int:end_int].T:
+                other_array -= species_count_array
+                drawn_array = rng.hypergeometric(np.broadcast_to(species_count_array, shape),
+                                                 np.broadcast_to(other_array, shape), left_array)
+                pairs_array += drawn_array * (drawn_array - 1)
+                left_array -= drawn_array
+        index_array[:, start_int:end_int] = resampled_index(pairs_array, draws)
+    if sample_size is None:  # Shifts each location's bootstrap SDIs to its observed SDI.
+        observed_array = resampled_index((count_array * (count_array - 1)).sum(axis=1), draw_array)
+        with np.errstate(invalid="ignore"):
+            mean_array = index_array.mean(axis=0)
+        index_array += observed_array - mean_array
+    return index_array
+
+
+# Calculates confidence intervals from resampled SDIs (percentile intervals).
+# Parameters: array of float (resamples x locations), float (confidence level).
+# Returns a tuple of two arrays of float (lower and upper bounds), one value per location.
+def confidence_interval(index_array, confidence=CONFIDENCE):
+    alpha_float = (1 - confidence) / 2
+    with np.errstate(invalid="ignore"):
+        bounds = np.quantile(index_array, [alpha_float, 1 - alpha_float], axis=0)
+    return bounds[0], bounds[1]
+
+
+# Returns the common sample size for rarefaction: the smallest N among locations with at least two birds.
+# Parameter is a list of lists of int (bird counts of each location). Returns None if there is no such location.
+def common_sample_size(count_lists):
+    total_list = [sum(count_list) for count_list in count_lists if sum(count_list) > 1]
+    return min(total_list) if total_list else None
+
+
+# Uncertainty of the SDIs of a RecordsIndex: bootstrap intervals, and rarefied SDIs with their intervals.
+# Parameters: RecordsIndex, list of str (location names, None for all locations in file order),
+# int (number of resamples), float (confidence level), int (rarefaction sample size, None for the
+# smallest N among the locations), int (seed).
+# Returns a tuple: dict {location name : {"low", "high", "rarefied", "rarefied_low", "rarefied_high"}}
+# (NaN where undefined), array of float (bootstrap SDIs, resamples x locations, same order as the dict).
+# Raises ValueError if a location is not in the records.
+def records_uncertainty(records, locations=None, resamples=RESAMPLES, confidence=CONFIDENCE, sample_size=None,
+                        seed=SEED):
+    if locations is None:
+        locations = records.locations()
+    count_lists = [split_records(records, location)[0] for location in locations]
+    if sample_size is None:
+        sample_size = common_sample_size(count_lists) or 0
+    bootstrap_array = resample_indices(count_lists, resamples, None, seed)
+    rarefied_array = resample_indices(count_lists, resamples, sample_size, seed + 1)
+    low_array, high_array = confidence_interval(bootstrap_array, confidence)
+    rarefied_low_array, rarefied_high_array = confidence_interval(rarefied_array, confidence)
+    # Mean of the rarefied SDIs, NaN for locations that could not be rarefied (np.nanmean would warn).
+    rarefied_count_array = np.count_nonzero(~np.isnan(rarefied_array), axis=0)
+    rarefied_mean_array = np.divide(np.nansum(rarefied_array, axis=0), rarefied_count_array,
+                                    out=np.full(len(locations), np.nan), where=rarefied_count_array > 0)
+    uncertainty_dict = {}
+    for i, location in enumerate(locations):
+        uncertainty_dict[location] = {"low": float(low_array[i]), "high": float(high_array[i]),
+                                      "rarefied": float(rarefied_mean_array[i]),
+                                      "rarefied_low": float(rarefied_low_array[i]),
+                                      "rarefied_high": float(rarefied_high_array[i])}
+    return uncertainty_dict, bootstrap_array
+
+
+# Finds the locations that cannot be told apart from one location: the confidence interval of the
+# difference between their resampled SDIs includes 0.
+# Parameters: list of str (location names, same order as the columns of index_array), array of float
+# (resampled SDIs, resamples x locations), str (location to compare with), float (confidence level).
+# Returns a list of str (location names, in the order of locations, without a_string).
+def indistinguishable_locations(locations, index_array, a_string, confidence=CONFIDENCE):
+    column_int = locations.index(a_string)
+    difference_array = index_array[:, [column_int]] - index_array
+    low_array, high_array = confidence_interval(difference_array, confidence)
+    return [location for i, location in enumerate(locations)
+            if i != column_int and low_array[i] <= 0 <= high_array[i]]
+
+
+# Recommends the location with the highest SDI (see location_recommendation) and finds the locations
+# that are statistically indistinguishable from it.
+# Parameters: RecordsIndex, dict {location name : SDI}, int (number of resamples), float (confidence level),
+# int (seed), str (output file, or None), ReportWriter (if given, used instead of the output file),
+# array of float (bootstrap SDIs already calculated, as returned by records_uncertainty, or None to resample),
+# list of str (location names of the columns of that array).
+# Returns a tuple: str (recommended location name), list of str (indistinguishable locations, None if no
+# other location has an SDI to compare with).
+# Raises ValueError if index_dict has no SDI.
+def uncertain_recommendation(records, index_dict, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED,
+                             file_name=OUTPUT_FILE, writer=None, index_array=None, locations=None):
+    recommended_place = location_recommendation(index_dict, None)
+    if index_array is None:
+        locations = [location for location, index_float in index_dict.items() if index_float == index_float]
+        count_lists = [split_records(records, location)[0] for location in locations]
+        index_array = resample_indices(count_lists, resamples, None, seed)
+    else:  # Same resamples as the intervals, only the columns of locations with an SDI.
+        column_list = [i for i, location in enumerate(locations)
+                       if location in index_dict and index_dict[location] == index_dict[location]]
+        locations = [locations[i] for i in column_list]
+        index_array = index_array[:, column_list]
+    tie_list = None  # Only one location with an SDI: nothing to compare with.
+    if len(locations) > 1:
+        tie_list = indistinguishable_locations(locations, index_array, recommended_place, confidence)
+    if writer is not None:
+        writer.write_recommendation(recommended_place, index_dict[recommended_place])
+        writer.write_indistinguishable(recommended_place, tie_list, confidence)
+    elif file_name is not None:
+        with ReportWriter(file_name, mode="a") as writer:
+            writer.write_recommendation(recommended_place, index_dict[recommended_place])
+            writer.write_indistinguishable(recommended_place, tie_list, confidence)
+    return recommended_place, tie_list
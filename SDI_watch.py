@@ -0,0 +1,213 @@
+## Watch mode: follows an observation file and recalculates only the location blocks that changed.
+## Each location block (lines between empty lines) is fingerprinted with a hash of its bytes. On every
+## change of the file, blocks whose fingerprint is already known are reused as they are; only new or
+## edited blocks are parsed and get a new SDI. index_dict is updated in place, and the report is
+## appended to when locations were only added at the end of the file, or rewritten from the kept
+## report rows (without recalculating) when blocks were edited or removed.
+## Blocks are read as read_records reads them: reading stops at END_MARKER and only the first block
+## of a duplicate location is used.
+## Usage: python SDI_watch.py [input file] [-o output file] [-f format] [--interval seconds] [--once]
+
+
+## LOADING THE LIBRARIES
+import argparse
+import hashlib
+import locale
+import os
+import re
+import sys
+import threading
+
+from SDI_calculator import (INPUT_FILE, INPUT_ERROR_MSG, NEWLINE, OUTPUT_ERROR_MSG, OUTPUT_FILE, RecordsIndex,
+                            calculate_index, split_lines)
+from SDI_report import REPORT_FORMATS, ReportWriter
+
+
+## DEFINING CONSTANTS
+POLL_INTERVAL = 60.0  # Seconds between two checks of the input file.
+# Line end of a location block's last line, then one or more empty lines (LF, CRLF or CR line ends).
+BLOCK_END = re.compile(b"(" + NEWLINE + b")(?:" + NEWLINE + b")+")
+
+
+## DEFINING FUNCTIONS
+# Splits file content into location blocks (bytes, without the empty lines between them).
+# Parameter is a bytes (file content).
+# Returns a list of bytes, in file order.
+def split_blocks(content):
+    blocks = []
+    position_int = 0
+    for match in BLOCK_END.finditer(content):
+        blocks.append(content[position_int:match.end(1)])
+        position_int = match.end()
+    blocks.append(content[position_int:])
+    return [block for block in blocks if block.strip(b"\r\n")]
+
+
+# Returns the first line of a location block (the location's name), decoded.
+# Parameters: bytes (block content), str (file encoding).
+def block_location(block, encoding):
+    return re.split(NEWLINE, block, maxsplit=1)[0].decode(encoding)
+
+
+# One parsed location block: records, SDI (None if it cannot be calculated) and its report rows.
+class Block:
+    def __init__(self, location, count_list, species_list, index_float, report_text):
+        self.location = location
+        self.count_list = count_list
+        self.species_list = species_list
+        self.index_float = index_float
+        self.report_text = report_text
+
+
+# Follows one observation file and keeps its SDIs and report up to date.
+# Parameters: str (input file), str (output file, None for no report), str (format name in REPORT_FORMATS).
+class BlockWatcher:
+    def __init__(self, file_name=INPUT_FILE, output_file=OUTPUT_FILE, report_format="table"):
+        self.file_name = file_name
+        self.output_file = output_file
+        self.report_format = REPORT_FORMATS[report_format]()
+        self.index_dict = {}  # {location name : SDI}, updated in place.
+        self.failed_list = []  # Locations whose SDI could not be calculated (fewer than two birds).
+        self.encoding = locale.getpreferredencoding(False)  # Same encoding as open() in read_records.
+        self._blocks = {}  # {fingerprint : Block} of the last update.
+        self._order = []  # Fingerprints of the last update's locations, in file order.
+        self._stat = None  # (modification time in ns, size in bytes) of the last update.
+
+    # Parses one block and calculates its SDI.
+    # Parameter is a bytes (block content).
+    # Returns a Block, or None if the block is END_MARKER (or holds no location).
+    def _parse_block(self, block):
+        records = RecordsIndex().add_lines(split_lines(block.decode(self.encoding)))
+        if not records.location_index:
+            return None
+        location = records.locations()[0]
+        count_list, species_list = records.get(location)
+        try:
+            index_float = calculate_index(count_list)
+            report_text = self.report_format.location(count_list, species_list, index_float, location)
+        except ZeroDivisionError:  # Fewer than two birds.
+            index_float = None
+            report_text = ""
+        return Block(location, count_list, species_list, index_float, report_text)
+
+    # Checks the input file and recalculates the blocks that are new or changed since the last update.
+    # Returns a tuple of two lists: locations recalculated (new or changed), locations removed.
+    # Raises OSError if the input file cannot be read (error.filename is the input file) or if the report
+    # cannot be written (error.filename is the report or its temporary file).
+    def update(self):
+        stat_result = os.stat(self.file_name)
+        stat = (stat_result.st_mtime_ns, stat_result.st_size)
+        if stat == self._stat:  # File unchanged.
+            return [], []
+        with open(self.file_name, "rb") as input_file:
+            content = input_file.read()
+        blocks = {}
+        order = []
+        locations = set()
+        changed_list = []
+        for block in split_blocks(content):
+            fingerprint = hashlib.blake2b(block, digest_size=16).digest()
+            parsed = self._blocks.get(fingerprint) or blocks.get(fingerprint)
+            if parsed is None:  # New or edited block.
+                if block_location(block, self.encoding) in locations:
+                    continue  # Duplicate location: only its first records are used.
+                parsed = self._parse_block(block)
+                if parsed is None:  # END_MARKER: following lines are ignored.
+                    break
+                changed_list.append(parsed.location)
+            elif parsed.location in locations:
+                continue
+            locations.add(parsed.location)
+            blocks[fingerprint] = parsed
+            order.append(fingerprint)
+        old_locations = [self._blocks[fingerprint].location for fingerprint in self._order]
+        removed_list = [location for location in old_locations if location not in locations]
+        # Locations only added at the end: old locations are unchanged and still first, in the same order.
+        appended = not removed_list and order[:len(self._order)] == self._order
+        self._update_index(blocks, order, removed_list)
+        if self.output_file is not None:
+            self._write_report(blocks, order, appended)
+        self._blocks = blocks
+        self._order = order
+        self._stat = stat
+        return changed_list, removed_list
+
+    # Updates index_dict and failed_list in place after an update.
+    # Parameters: dict {fingerprint : Block}, list of fingerprints (file order), list of str (removed locations).
+    def _update_index(self, blocks, order, removed_list):
+        for location in removed_list:
+            self.index_dict.pop(location, None)
+        failed_list = []
+        for fingerprint in order:
+            parsed = blocks[fingerprint]
+            if parsed.index_float is None:
+                failed_list.append(parsed.location)
+                self.index_dict.pop(parsed.location, None)
+            else:
+                self.index_dict[parsed.location] = parsed.index_float
+        self.failed_list = failed_list
+
+    # Writes the report after an update: only the new rows if locations were only appended,
+    # otherwise the whole report from the kept rows (written to a temporary file, then renamed).
+    # Parameters: dict {fingerprint : Block}, list of fingerprints (file order), bool (only appended).
+    def _write_report(self, blocks, order, appended):
+        if appended and self._stat is not None:
+            new_order = order[len(self._order):]
+            if not new_order:
+                return
+            writer = ReportWriter(self.output_file, self.report_format, mode="a")
+        else:
+            new_order = order
+            writer = ReportWriter(self.output_file, self.report_format, atomic=True)
+        with writer:
+            for fingerprint in new_order:
+                if blocks[fingerprint].report_text:
+                    writer.write_text(blocks[fingerprint].report_text)
+
+    # Checks the input file every interval seconds until stop_event is set.
+    # Parameters: float (seconds between checks), function called with (recalculated, removed) after each
+    # update that changed something (or None), threading.Event (or None to watch forever).
+    def watch(self, interval_float=POLL_INTERVAL, callback=None, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            changed_list, removed_list = self.update()
+            if callback is not None and (changed_list or removed_list):
+                callback(changed_list, removed_list)
+            stop_event.wait(interval_float)
+
+
+# Prints the outcome of an update. Parameters: list of str (recalculated locations), list of str (removed).
+def print_update(changed_list, removed_list):
+    print(f"{len(changed_list)} location(s) recalculated, {len(removed_list)} removed.", flush=True)
+
+
+# Runs watch mode from the command line. Parameter is a list of str (None to use sys.argv).
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Follow an observation file and recalculate changed locations only.")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="observation records (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE, help="report file (default: %(default)s)")
+    parser.add_argument("-f", "--format", choices=sorted(REPORT_FORMATS), default="table",
+                        help="report format (default: %(default)s)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help="seconds between two checks of the input file (default: %(default)s)")
+    parser.add_argument("--once", action="store_true", help="update once and exit")
+    arguments = parser.parse_args(argv)
+    watcher = BlockWatcher(arguments.input_file, arguments.output, arguments.format)
+    try:
+        if arguments.once:
+            print_update(*watcher.update())
+        else:
+            watcher.watch(arguments.interval, print_update)
+    except OSError as error:
+        if error.filename == arguments.input_file:  # Input file doesn't exist or cannot be read.
+            print(INPUT_ERROR_MSG, file=sys.stderr)
+        else:  # Report cannot be created or written.
+            print(OUTPUT_ERROR_MSG, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:  # User stopped watch mode.
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())